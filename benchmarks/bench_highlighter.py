@@ -0,0 +1,113 @@
+# bench_highlighter.py
+# highlightBlock throughput of SyntaxHighlighter against the previous
+# implementation, which recompiled every pattern on every block.
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/bench_highlighter.py
+import os
+import random
+import re
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QSyntaxHighlighter, QTextCharFormat, QTextDocument
+from PyQt6.QtWidgets import QApplication
+
+from ttpbuilder.HighlighterTEWidget import SyntaxHighlighter
+
+
+class LegacySyntaxHighlighter(QSyntaxHighlighter):
+    # Copy of the original per-block, per-pattern implementation, kept as the baseline
+    def __init__(self, document):
+        QSyntaxHighlighter.__init__(self, document)
+        self.keywords = []
+        self.syntax_type = None
+
+    def set_syntax_type(self, syntax_type):
+        self.syntax_type = syntax_type
+
+    def highlightBlock(self, text):
+        if self.syntax_type == "keyword":
+            format = QTextCharFormat()
+            format.setFontWeight(QFont.Weight.Bold)
+            format.setForeground(Qt.GlobalColor.darkMagenta)
+            for keyword in self.keywords:
+                self.highlight_pattern(text, f"\\b{keyword}\\b", format)
+        elif self.syntax_type == "jinja":
+            for pattern, color in ((r"\{\{.*?\}\}", Qt.GlobalColor.darkCyan),
+                                   (r"\{%\s*for.*?%\}", Qt.GlobalColor.green),
+                                   (r"\{%\s*(if|elif|else).*?%\}", Qt.GlobalColor.blue),
+                                   (r"\{%\s*end(for|if).*?%\}", Qt.GlobalColor.green)):
+                format = QTextCharFormat()
+                format.setFontWeight(QFont.Weight.Bold)
+                format.setForeground(color)
+                self.highlight_pattern(text, pattern, format)
+
+    def highlight_pattern(self, text, pattern, format):
+        expression = re.compile(pattern)
+        index = expression.search(text)
+        while index:
+            start, end = index.span()
+            self.setFormat(start, end - start, format)
+            index = expression.search(text, start + end - start)
+
+
+def template_text(lines, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for i in range(lines):
+        out.append(rng.choice([
+            f"interface {{{{ interface_{i} }}}}",
+            f" description {{{{ description | ORPHRASE }}}}",
+            f" ip address {{{{ ip | IP }}}} {{{{ mask }}}}",
+            f" switchport access vlan {{{{ vlan | DIGIT }}}}",
+            "{% for item in items %}",
+            "{% endfor %}",
+            " shutdown",
+        ]))
+    return '\n'.join(out)
+
+
+def keyword_text(lines, keywords, seed=1):
+    rng = random.Random(seed)
+    vocabulary = keywords + ['router', 'bgp', 'neighbor', '10.0.0.1', 'remote-as', 'permit', 'any']
+    return '\n'.join(' '.join(rng.choice(vocabulary) for _ in range(10)) for _ in range(lines))
+
+
+def time_rehighlight(highlighter_class, text, syntax_type, keywords=None, repeat=3):
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = highlighter_class(document)
+    highlighter.keywords = keywords or []
+    highlighter.set_syntax_type(syntax_type)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        highlighter.rehighlight()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return document.blockCount() / best
+
+
+def run(lines=5000, keyword_count=300):
+    keywords = [f"kw{i}" for i in range(keyword_count)]
+    results = []
+    for name, text, syntax_type in (('jinja', template_text(lines), 'jinja'),
+                                    ('keyword', keyword_text(lines // 5, keywords), 'keyword')):
+        legacy = time_rehighlight(LegacySyntaxHighlighter, text, syntax_type, keywords)
+        current = time_rehighlight(SyntaxHighlighter, text, syntax_type, keywords)
+        results.append({'syntax': name, 'legacy_blocks_per_s': legacy, 'blocks_per_s': current,
+                        'speedup': current / legacy})
+    return results
+
+
+def main():
+    app = QApplication.instance() or QApplication([])
+    for row in run():
+        print(f"{row['syntax']:>8}: legacy {row['legacy_blocks_per_s']:10.0f} blocks/s, "
+              f"current {row['blocks_per_s']:10.0f} blocks/s, {row['speedup']:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
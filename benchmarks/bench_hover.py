@@ -0,0 +1,64 @@
+# bench_hover.py
+# Microbenchmark for named-selection hit testing on hover.
+# Compares the interval index against the original linear scan over named_selections.
+#
+#   python benchmarks/bench_hover.py
+import random
+import timeit
+
+from ttpbuilder.Library.selection_index import SelectionIndex
+
+
+def build_selections(count, seed=1):
+    # Lay selections out like tokens on successive 40 character lines
+    rng = random.Random(seed)
+    named_selections = {}
+    index = SelectionIndex()
+    for i in range(count):
+        start = i * 40 + rng.randint(0, 20)
+        end = start + rng.randint(2, 15)
+        unique_id = str(i)
+        named_selections[unique_id] = {'start': start, 'end': end}
+        index.add(unique_id, start, end)
+    return named_selections, index
+
+
+def linear_find(named_selections, position):
+    for unique_id, data in named_selections.items():
+        if position >= data['start'] and position <= data['end']:
+            return unique_id
+    return None
+
+
+def run(sizes=(10, 1000, 100000), lookups=2000, seed=1):
+    rng = random.Random(seed)
+    results = []
+    for size in sizes:
+        named_selections, index = build_selections(size, seed)
+        positions = [rng.randint(0, size * 40) for _ in range(lookups)]
+        # The linear scan is far too slow to run every lookup at 100k
+        linear_positions = positions[:max(10, lookups * 1000 // max(size, 1000))]
+
+        index_time = timeit.timeit(lambda: [index.find(p) for p in positions], number=1)
+        linear_time = timeit.timeit(lambda: [linear_find(named_selections, p) for p in linear_positions], number=1)
+
+        # Both strategies must agree on whether a position is clickable
+        for p in linear_positions:
+            assert (index.find(p) is None) == (linear_find(named_selections, p) is None)
+
+        results.append({
+            'selections': size,
+            'index_us_per_lookup': index_time / len(positions) * 1e6,
+            'linear_us_per_lookup': linear_time / len(linear_positions) * 1e6,
+        })
+    return results
+
+
+def main():
+    for row in run():
+        print(f"{row['selections']:>7} selections: index {row['index_us_per_lookup']:8.2f} us/lookup, "
+              f"linear {row['linear_us_per_lookup']:10.2f} us/lookup")
+
+
+if __name__ == '__main__':
+    main()
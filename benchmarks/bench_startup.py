@@ -0,0 +1,144 @@
+# bench_startup.py
+# Startup time of the GUI: cold start to first paint in a fresh interpreter,
+# and the import profile from `python -X importtime`. Exits non-zero when a
+# budget is exceeded or a deferred module (QtWebEngine, ttp, the highlighter)
+# is loaded before the first paint, so it can gate a CI job.
+#
+#   python benchmarks/bench_startup.py --runs 5 -o startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFERRED_MODULES = ['PyQt6.QtWebEngineWidgets', 'PyQt6.QtWebEngineCore', 'ttp', 'ttpbuilder.HighlighterTEWidget',
+                    'http.client']
+
+# Runs in a fresh interpreter; reports its timings once the window has painted
+CHILD = r'''
+import json, sys, time
+started = time.time()
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+from ttpbuilder.ttpgui import TTPGuiUI
+imported = time.time()
+
+
+class FirstPaint(QObject):
+    painted = None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and self.painted is None:
+            self.painted = time.time()
+            QTimer.singleShot(0, report)
+        return False
+
+
+def report():
+    print(json.dumps({
+        'interpreter_started': started,
+        'imports_ms': (imported - started) * 1000,
+        'window_ms': (built - imported) * 1000,
+        'painted': watcher.painted,
+        'deferred_loaded': [name for name in sys.argv[1:] if name in sys.modules],
+    }))
+    app.quit()
+
+
+app = QApplication(sys.argv[:1])
+window = TTPGuiUI()
+window.resize(800, 600)
+built = time.time()
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+app.exec()
+window.close()
+'''
+
+
+def cold_start(platform):
+    env = dict(os.environ)
+    if platform:
+        env['QT_QPA_PLATFORM'] = platform
+    spawned = time.time()
+    output = subprocess.run([sys.executable, '-c', CHILD] + DEFERRED_MODULES, env=env, capture_output=True,
+                            text=True, check=True).stdout
+    child = json.loads(output.strip().splitlines()[-1])
+    return {
+        'first_paint_ms': (child['painted'] - spawned) * 1000,
+        'interpreter_ms': (child['interpreter_started'] - spawned) * 1000,
+        'imports_ms': child['imports_ms'],
+        'window_ms': child['window_ms'],
+        'deferred_loaded': child['deferred_loaded'],
+    }
+
+
+def import_profile(module='ttpbuilder.ttpgui', top=15):
+    # Parse `-X importtime` lines: "import time: self [us] | cumulative | imported package"
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    total_us = next(cumulative for name, _, cumulative in modules if name == module)
+    heaviest = sorted(modules, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        'total_ms': total_us / 1000,
+        'heaviest': [{'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000}
+                     for name, self_us, cumulative_us in heaviest],
+        'deferred_loaded': [name for name, _, _ in modules if name in DEFERRED_MODULES],
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Measure ttpbuilder startup time against a budget.')
+    arg_parser.add_argument('--runs', type=int, default=5, help='cold starts to take the median of')
+    arg_parser.add_argument('--first-paint-budget', type=float, default=1500, help='budget in ms (default: 1500)')
+    arg_parser.add_argument('--import-budget', type=float, default=400, help='budget in ms (default: 400)')
+    arg_parser.add_argument('--platform', default='offscreen',
+                            help="QT_QPA_PLATFORM for the cold starts, '' for the native one (default: offscreen)")
+    arg_parser.add_argument('-o', '--output', help='also write the JSON report here')
+    args = arg_parser.parse_args(argv)
+
+    runs = [cold_start(args.platform) for _ in range(args.runs)]
+    imports = import_profile()
+    report = {
+        'first_paint_ms': statistics.median(run['first_paint_ms'] for run in runs),
+        'runs': runs,
+        'imports': imports,
+        'budgets': {'first_paint_ms': args.first_paint_budget, 'import_ms': args.import_budget},
+    }
+
+    failures = []
+    if report['first_paint_ms'] > args.first_paint_budget:
+        failures.append(f"first paint {report['first_paint_ms']:.0f} ms is over the "
+                        f"{args.first_paint_budget:.0f} ms budget")
+    if imports['total_ms'] > args.import_budget:
+        failures.append(f"importing the GUI takes {imports['total_ms']:.0f} ms, over the "
+                        f"{args.import_budget:.0f} ms budget")
+    deferred = sorted(set(imports['deferred_loaded']).union(*(run['deferred_loaded'] for run in runs)))
+    if deferred:
+        failures.append(f"loaded at startup but meant to be deferred: {', '.join(deferred)}")
+    report['failures'] = failures
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    print(f"first paint (median of {len(runs)}): {report['first_paint_ms']:.0f} ms, "
+          f"GUI imports: {imports['total_ms']:.0f} ms")
+    for entry in imports['heaviest'][:5]:
+        print(f"  {entry['module']:<40} self {entry['self_ms']:7.1f} ms  cumulative {entry['cumulative_ms']:7.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# suite.py
+# End-to-end benchmark suite over synthetic captures. Drives a real TTPGuiUI
+# under the offscreen Qt platform and writes timings as JSON, so runs on
+# different commits can be compared with --baseline.
+#
+#   python benchmarks/suite.py --lines 2000 20000 --selections 200 2000 -o run.json
+#   python benchmarks/suite.py -o new.json --baseline run.json
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QEvent, QEventLoop, QPointF, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtGui import QHoverEvent, QTextCursor, QTextDocument
+from PyQt6.QtWidgets import QApplication, QInputDialog
+
+from ttpbuilder.HighlighterTEWidget import SyntaxHighlighter
+from ttpbuilder.Library import util
+from ttpbuilder.Library.result_cache import ttp_version
+from ttpbuilder.ttpgui import TTPGuiUI
+
+from synthetic import generate, pick_spans
+
+BENCHMARKS = ['load_text', 'add_named_selection', 'name_selection', 'highlight_text', 'hover',
+              'generate_template', 'highlight_block', 'test_template']
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'runs': len(samples),
+        'total_ms': sum(samples) * 1e3,
+        'mean_ms': statistics.fmean(samples) * 1e3,
+        'median_ms': statistics.median(samples) * 1e3,
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e3,
+        'max_ms': samples[-1] * 1e3,
+    }
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def select(window, start, end):
+    cursor = window.text_edit.textCursor()
+    cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
+    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+    window.text_edit.setTextCursor(cursor)
+
+
+def wait_for(condition, timeout):
+    # Spin the event loop until condition() holds, as the GUI would between events
+    loop = QEventLoop()
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('benchmark step timed out')
+        loop.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 10)
+
+
+def run_case(lines, selection_count, enabled, named=200, repeat=20, parse_runs=3, seed=1):
+    rng = random.Random(seed)
+    text, spans = generate(lines, seed)
+    named_spans = pick_spans(spans, min(selection_count, named))
+    named_set = set(named_spans)
+    bulk_spans = [span for span in pick_spans(spans, selection_count) if span not in named_set]
+    results = {'lines': text.count('\n'), 'selections': len(named_spans) + len(bulk_spans)}
+
+    window = TTPGuiUI()
+    window.resize(1000, 700)
+    window.show()
+    QApplication.processEvents()
+    try:
+        elapsed, _ = timed(lambda: (window.text_edit.setPlainText(text), window.make_readonly()))
+        if 'load_text' in enabled:
+            results['load_text'] = summarize([elapsed])
+
+        # Pasted text maps document positions 1:1 onto capture offsets
+        samples = []
+        for start, end, name, match_type in bulk_spans:
+            ttp_text = f"{{{{{name} | {match_type}}}}}" if match_type else f"{{{{{name}}}}}"
+            samples.append(timed(util.add_named_selection, window, start, end, text[start:end], ttp_text)[0])
+        if 'add_named_selection' in enabled and samples:
+            results['add_named_selection'] = summarize(samples)
+
+        samples = []
+        for start, end, name, _ in named_spans:
+            select(window, start, end)
+            QInputDialog.getText = staticmethod(lambda *args, name=name, **kwargs: (name, True))
+            samples.append(timed(util.name_selection, window)[0])
+        if 'name_selection' in enabled:
+            results['name_selection'] = summarize(samples)
+        QApplication.processEvents()
+
+        # highlight_text became the viewport overlay; time a rebuild at scattered scroll positions
+        if 'highlight_text' in enabled:
+            scrollbar = window.text_edit.verticalScrollBar()
+            samples = []
+            for _ in range(repeat):
+                scrollbar.setValue(rng.randint(0, scrollbar.maximum()))
+                samples.append(timed(window.selection_overlay.rebuild)[0])
+            results['highlight_text'] = summarize(samples)
+
+        if 'hover' in enabled:
+            viewport = window.text_edit.viewport()
+            samples = []
+            for _ in range(repeat * 50):
+                point = QPointF(rng.randint(0, viewport.width() - 1), rng.randint(0, viewport.height() - 1))
+                event = QHoverEvent(QEvent.Type.HoverMove, point, point, point)
+                samples.append(timed(window.eventFilter, window.text_edit, event)[0])
+            window.clear_hover_cursor()
+            results['hover'] = summarize(samples)
+
+        templates = []
+        util.show_template_dialog = lambda parent, template, timer=None: templates.append(template)
+        samples = [timed(util.generate_template, window)[0] for _ in range(max(1, repeat // 4))]
+        template = templates[-1]
+        if 'generate_template' in enabled:
+            results['generate_template'] = summarize(samples)
+
+        if 'highlight_block' in enabled:
+            document = QTextDocument()
+            document.setPlainText(template)
+            highlighter = SyntaxHighlighter(document)
+            highlighter.set_syntax_type('jinja')
+            samples = [timed(highlighter.rehighlight)[0] for _ in range(5)]
+            results['highlight_block'] = summarize(samples)
+            results['highlight_block']['blocks'] = document.blockCount()
+
+        if 'test_template' in enabled:
+            # The result cache is off so every run parses; the first run also starts the worker.
+            # Large templates over large captures legitimately take minutes.
+            window.use_result_cache = False
+            window.test_timeout = 3600
+            parsed = []
+            util.show_results_dialog = lambda parent, results, status=None, timer=None: parsed.append(results)
+            samples = []
+            for run in range(max(2, parse_runs)):
+                started = time.perf_counter()
+                util.test_template(window, template)
+                wait_for(lambda: len(parsed) > run, window.test_timeout + 60)
+                samples.append(time.perf_counter() - started)
+                if parsed[-1] and isinstance(parsed[-1][0], dict) and 'error' in parsed[-1][0]:
+                    raise RuntimeError(parsed[-1][0]['error'])
+            results['test_template_cold'] = summarize(samples[:1])
+            results['test_template'] = summarize(samples[1:])
+    finally:
+        window.close()
+    return results
+
+
+def compare(report, baseline):
+    # Median ratio of this run over the baseline, per matching case and benchmark
+    cases = {(case['lines'], case['selections']): case for case in baseline.get('cases', [])}
+    for case in report['cases']:
+        previous = cases.get((case['lines'], case['selections']))
+        if previous is None:
+            continue
+        print(f"{case['lines']} lines / {case['selections']} selections vs baseline:")
+        for name, stats in case.items():
+            if isinstance(stats, dict) and isinstance(previous.get(name), dict) and previous[name]['median_ms']:
+                ratio = stats['median_ms'] / previous[name]['median_ms']
+                print(f"  {name:<22} {stats['median_ms']:10.3f} ms  {ratio:6.2f}x")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmark ttpbuilder over synthetic device captures.')
+    arg_parser.add_argument('--lines', type=int, nargs='+', default=[2000, 20000], help='capture sizes in lines')
+    arg_parser.add_argument('--selections', type=int, nargs='+', default=[200, 2000],
+                            help='named selections per capture')
+    arg_parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='run only these benchmarks')
+    arg_parser.add_argument('--repeat', type=int, default=20, help='repetitions for the short benchmarks')
+    arg_parser.add_argument('--parse-runs', type=int, default=3,
+                            help='test_template runs per case, the first one is reported as cold')
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('-o', '--output', help='write the JSON report here instead of stdout')
+    arg_parser.add_argument('--baseline', help='earlier JSON report to compare medians against')
+    args = arg_parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    enabled = set(args.only or BENCHMARKS)
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt': QT_VERSION_STR,
+            'pyqt': PYQT_VERSION_STR,
+            'ttp': ttp_version(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': {'repeat': args.repeat, 'parse_runs': args.parse_runs, 'seed': args.seed},
+        'cases': [],
+    }
+    for lines in args.lines:
+        for selection_count in args.selections:
+            print(f"running {lines} lines / {selection_count} selections", file=sys.stderr)
+            report['cases'].append(run_case(lines, selection_count, enabled, repeat=args.repeat,
+                                            parse_runs=args.parse_runs, seed=args.seed))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# synthetic.py
+# Deterministic Cisco/Juniper-style captures for the benchmarks. Alongside the
+# text, every generated value is reported as a span (start, end, name,
+# match_type) so benchmarks can create named selections without searching.
+import random
+
+CISCO_MEDIA = ['GigabitEthernet', 'TenGigabitEthernet', 'FastEthernet']
+JUNIPER_MEDIA = ['ge', 'xe', 'et']
+DESCRIPTIONS = ['uplink to core', 'access port', 'server farm', 'WAN circuit', 'management', 'unused']
+
+
+class CaptureBuilder:
+    def __init__(self):
+        self._parts = []
+        self.length = 0
+        self.line_count = 0
+        self.spans = []
+
+    def line(self, *pieces):
+        # pieces are plain strings or (value, name, match_type) tuples
+        for piece in pieces:
+            if isinstance(piece, tuple):
+                value, name, match_type = piece
+                self.spans.append((self.length, self.length + len(value), name, match_type))
+                piece = value
+            self._parts.append(piece)
+            self.length += len(piece)
+        self._parts.append('\n')
+        self.length += 1
+        self.line_count += 1
+
+    def text(self):
+        return ''.join(self._parts)
+
+
+def _ip(rng):
+    return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def cisco_running_config(builder, rng, count):
+    for _ in range(count):
+        port = f"{rng.choice(CISCO_MEDIA)}{rng.randint(0, 4)}/{rng.randint(0, 1)}/{rng.randint(0, 48)}"
+        builder.line('interface ', (port, 'interface', None))
+        builder.line(' description ', (rng.choice(DESCRIPTIONS), 'description', 'ORPHRASE'))
+        if rng.random() < 0.5:
+            builder.line(' switchport access vlan ', (str(rng.randint(1, 4094)), 'vlan', 'DIGIT'))
+            builder.line(' switchport mode access')
+        else:
+            builder.line(' ip address ', (_ip(rng), 'ip', 'IP'), ' ', ('255.255.255.0', 'mask', None))
+        if rng.random() < 0.2:
+            builder.line(' shutdown')
+        builder.line('!')
+
+
+def cisco_ip_interface_brief(builder, rng, count):
+    builder.line('Interface              IP-Address      OK? Method Status                Protocol')
+    for _ in range(count):
+        port = f"Gi{rng.randint(0, 4)}/{rng.randint(0, 1)}/{rng.randint(0, 48)}"
+        status = rng.choice(['up', 'down', 'administratively down'])
+        builder.line((port, 'interface', None), ' ' * (23 - len(port)), (_ip(rng), 'ip', 'IP'),
+                     '  YES NVRAM  ', (status, 'status', 'ORPHRASE'), ' ' * (22 - len(status)),
+                     (rng.choice(['up', 'down']), 'protocol', None))
+
+
+def juniper_interfaces_terse(builder, rng, count):
+    builder.line('Interface               Admin Link Proto    Local                 Remote')
+    for _ in range(count):
+        port = f"{rng.choice(JUNIPER_MEDIA)}-{rng.randint(0, 1)}/{rng.randint(0, 3)}/{rng.randint(0, 47)}.0"
+        builder.line((port, 'interface', None), ' ' * (24 - len(port)), 'up    up   inet     ',
+                     (f"{_ip(rng)}/24", 'prefix', 'PREFIX'))
+
+
+SECTIONS = [cisco_running_config, cisco_ip_interface_brief, juniper_interfaces_terse]
+
+
+def generate(lines, seed=1, vendors=None):
+    # Returns (text, spans) with at least `lines` lines, cycling through the
+    # output sections in blocks of up to 50 entries
+    rng = random.Random(seed)
+    sections = vendors or SECTIONS
+    builder = CaptureBuilder()
+    while builder.line_count < lines:
+        rng.choice(sections)(builder, rng, rng.randint(5, 50))
+    return builder.text(), builder.spans
+
+
+def pick_spans(spans, count):
+    # `count` spans spread evenly across the capture
+    if count >= len(spans):
+        return list(spans)
+    step = len(spans) / count
+    return [spans[int(i * step)] for i in range(count)]
@@ -26,6 +26,9 @@ setup(
     entry_points={
         'console_scripts': [
             'ttpbuilder=ttpbuilder.ttpgui:main',
+            'ttpbuilder-batch=ttpbuilder.batch:main',
+            'ttpbuilder-library=ttpbuilder.library:main',
+            'ttpbuilder-serve=ttpbuilder.serve:main',
         ],
     },
     python_requires='>=3.9',
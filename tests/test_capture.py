@@ -0,0 +1,41 @@
+from ttpbuilder.Library.capture import Capture
+
+DATA = 'interface Gi1\r\n description café ☃ uplink\r\ninterface Gi2\r\n description bad \xff byte\r\n'
+
+
+def _file_capture(tmp_path, data=DATA):
+    path = tmp_path / 'capture.txt'
+    path.write_bytes(data.encode('utf-8').replace('\xff'.encode('utf-8'), b'\xff'))
+    return Capture.from_file(str(path))
+
+
+def test_file_text_is_utf8(tmp_path):
+    capture = _file_capture(tmp_path)
+    assert capture.is_mapped
+    assert capture.text(0, 2) == 'interface Gi1\n description café ☃ uplink'
+    assert capture.line_text(1) == ' description café ☃ uplink'
+    assert capture.line_text(3) == ' description bad � byte'
+    capture.close()
+
+
+def test_columns_map_to_byte_offsets(tmp_path):
+    capture = _file_capture(tmp_path)
+    for line in range(capture.line_count):
+        text = capture.line_text(line)
+        for column in range(len(text) + 1):
+            offset = capture.offset_of(line, column)
+            assert capture.column_of(line, offset) == column
+    # "uplink" sits after two 2- and 3-byte characters
+    line_start = capture.line_start(1)
+    column = capture.line_text(1).index('uplink')
+    assert capture.offset_of(1, column) - line_start == column + 3
+    assert capture.raw_text(1, 2)[column + 3:column + 9] == 'uplink'
+    capture.close()
+
+
+def test_pasted_text_offsets_are_columns():
+    capture = Capture.from_text(DATA.replace('\r\n', '\n'))
+    assert not capture.is_mapped
+    assert capture.offset_of(1, 5) == capture.line_start(1) + 5
+    assert capture.column_of(1, capture.line_start(1) + 5) == 5
+    assert capture.line_text(1) == ' description café ☃ uplink'
@@ -0,0 +1,61 @@
+from ttpbuilder.Library.capture import Capture
+from ttpbuilder.Library.chunked import merge_results, parse_chunked, plan_chunks
+from ttpbuilder.Library.core import parse_text
+from ttpbuilder.Library.grouping import collapse_repeats
+
+TEMPLATE = '''<group name="interfaces">
+interface {{ interface }}
+ description {{ description | ORPHRASE }}
+ ip address {{ ip }} {{ mask }}
+</group>'''
+
+
+def _config(count):
+    return ''.join(f"interface Gi{index}\n description link {index} café\n ip address 10.0.{index}.1 255.255.255.0\n!\n"
+                   for index in range(count))
+
+
+def test_plan_chunks_cuts_at_group_starts():
+    capture = Capture.from_text(_config(10))
+    strategy, chunks = plan_chunks(TEMPLATE, capture, chunk_lines=6)
+    assert strategy == 'group'
+    assert chunks[0][0] == 0 and chunks[-1][1] == capture.line_count
+    for first, _ in chunks:
+        assert capture.line_text(first).startswith('interface')
+
+
+def test_chunked_parse_matches_serial(tmp_path):
+    data = _config(25)
+    path = tmp_path / 'capture.txt'
+    path.write_bytes(data.encode('utf-8'))
+    capture = Capture.from_file(str(path))
+    results, info = parse_chunked(TEMPLATE, capture, map, chunk_lines=12, verify=True)
+    capture.close()
+    assert info['chunks'] > 1
+    assert info['mismatch'] is None
+    assert results == parse_text(TEMPLATE, data)
+    assert results[0]['interfaces'][3]['description'] == 'link 3 café'
+
+
+def test_merge_results():
+    first = [{'interfaces': {'interface': 'Gi1'}, 'hostname': 'R1'}]
+    second = [{'interfaces': [{'interface': 'Gi2'}, {'interface': 'Gi3'}]}]
+    assert merge_results([first, [{}], second]) == [
+        {'interfaces': [{'interface': 'Gi1'}, {'interface': 'Gi2'}, {'interface': 'Gi3'}], 'hostname': 'R1'}]
+    # Dicts keyed by a dynamic path merge key by key
+    assert merge_results([[{'vlans': {'10': {'name': 'a'}}}], [{'vlans': {'20': {'name': 'b'}}}]]) == [
+        {'vlans': {'10': {'name': 'a'}, '20': {'name': 'b'}}}]
+    assert merge_results([]) == [{}]
+
+
+def test_collapsed_template_with_top_level_group_matches_serial():
+    lines = ['hostname {{ hostname }}', 'interface {{ interface }}', ' description {{ description | ORPHRASE }}',
+             'interface {{ interface }}', ' description {{ description | ORPHRASE }}', 'ntp server {{ ntp }}']
+    template = '\n'.join(collapse_repeats(lines))
+    assert template.startswith('<group name="_">')
+    data = 'hostname R1\n' + ''.join(f"interface Gi{index}\n description link {index}\n"
+                                     for index in range(30000)) + 'ntp server 1.1.1.1\n'
+    results, info = parse_chunked(template, Capture.from_text(data), map, workers=4)
+    assert info['serial'] == 'top level matches'
+    assert results == parse_text(template, data)
+    assert results[0]['ntp'] == '1.1.1.1'
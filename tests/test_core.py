@@ -0,0 +1,36 @@
+from ttpbuilder.Library.core import ParserCache, first_difference, parse_text
+
+RECORD_TEMPLATE = '''<group name="host">
+hostname {{ hostname | record("hostname") }}
+</group>
+<group name="interfaces">
+interface {{ interface | _start_ }}
+{{ host | set("hostname") }}
+</group>'''
+
+
+def test_cached_parser_forgets_recorded_values():
+    cache = ParserCache()
+    first = cache.parse(RECORD_TEMPLATE, 'hostname R1\ninterface Gi1\n')
+    assert first[0]['interfaces']['host'] == 'R1'
+
+    second = cache.parse(RECORD_TEMPLATE, 'interface Gi2\n')
+    assert second == parse_text(RECORD_TEMPLATE, 'interface Gi2\n')
+    assert second[0]['interfaces']['host'] == 'hostname'
+    assert cache.stats()['hits'] == 1
+
+
+def test_cached_parser_matches_fresh_parser():
+    cache = ParserCache()
+    group = '<group name="i">\ninterface {{ interface }}\n description {{ description | ORPHRASE }}\n</group>'
+    # per_template results are a dict, not a list per input
+    for template in (group, f'<template results="per_template">\n{group}\n</template>'):
+        for data in ('interface Gi1\n description uplink to core\ninterface Gi2\n', 'interface Gi2\n', ''):
+            assert cache.parse(template, data) == parse_text(template, data)
+
+
+def test_first_difference():
+    assert first_difference({'a': [1, 2]}, {'a': [1, 2]}) is None
+    assert first_difference({'a': [1, 3]}, {'a': [1, 2]}) == 'results.a[1]: 3 != 2'
+    assert first_difference({'a': 1, 'b': 2}, {'a': 1}) == 'results.b: unexpected'
+    assert first_difference([1], [1, 2]) == 'results: 1 items != 2'
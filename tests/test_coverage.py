@@ -0,0 +1,44 @@
+from ttpbuilder.Library.core import parse_text
+from ttpbuilder.Library.coverage import capture_coverage, column_label, template_columns
+
+TEMPLATE = '''<group name="interfaces.{{ interface }}">
+interface {{ interface }}
+ description {{ description | ORPHRASE }}
+ shutdown {{ disabled | set(True) }}
+ {{ ignore(".*") }} noise
+<group name="ipv4*">
+ ip address {{ ip }} {{ mask }}
+</group>
+</group>
+<group name="_">
+hostname {{ hostname }}
+</group>'''
+
+DATA = '''hostname R1
+interface Gi1
+ description uplink
+ ip address 10.0.0.1 255.255.255.0
+interface Gi2
+ shutdown
+'''
+
+
+def test_template_columns():
+    columns = template_columns(TEMPLATE)
+    # The dynamic path variable is a key, ignored variables are no column
+    assert [column_label(column) for column in columns] == [
+        'interfaces.*.description', 'interfaces.*.disabled', 'interfaces.*.ipv4.ip', 'interfaces.*.ipv4.mask',
+        'hostname']
+
+
+def test_capture_coverage():
+    columns = template_columns(TEMPLATE)
+    matches, fills = capture_coverage(columns, parse_text(TEMPLATE, DATA))
+    # Two interfaces, one address and the top level
+    assert matches == 4
+    assert fills == [0.5, 0.5, 1.0, 1.0, 1.0]
+
+
+def test_capture_coverage_without_matches():
+    columns = template_columns(TEMPLATE)
+    assert capture_coverage(columns, parse_text(TEMPLATE, 'nothing here\n')) == (0, [0.0] * len(columns))
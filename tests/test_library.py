@@ -0,0 +1,23 @@
+from ttpbuilder.library import main
+
+TEMPLATE = '<group name="h">\nhostname {{ hostname }}\n</group>'
+
+
+def test_add_refuses_existing_name_without_force(tmp_path, capsys):
+    library = str(tmp_path / 'library')
+    template = tmp_path / 'hosts.ttp'
+    template.write_text(TEMPLATE)
+    assert main(['--library', library, 'add', str(template)]) == 0
+
+    template.write_text(TEMPLATE.replace('hostname', 'host'))
+    assert main(['--library', library, 'add', str(template)]) == 1
+    assert 'use --force' in capsys.readouterr().err
+    assert (tmp_path / 'library' / 'hosts.ttp').read_text() == TEMPLATE
+
+    assert main(['--library', library, 'add', '--force', str(template)]) == 0
+    assert 'host {{' in (tmp_path / 'library' / 'hosts.ttp').read_text()
+
+
+def test_remove_unknown_name_fails(tmp_path, capsys):
+    assert main(['--library', str(tmp_path), 'remove', 'missing']) == 1
+    assert 'no such template' in capsys.readouterr().err
@@ -0,0 +1,38 @@
+import pytest
+
+from ttpbuilder.Library.core import parse_text
+from ttpbuilder.Library.prefilter import Prefilter, parse_prefiltered, required_literal
+
+DATA = '''hostname R1
+interface GigabitEthernet0/1 up
+interface GigabitEthernet0/2 down
+interface GigabitEthernet1/0/3 up
+ ip address 10.0.0.1 255.255.255.0
+ ip address 10.0.1.1 255.255.255.252
+logging host 10.9.9.9
+'''
+
+
+@pytest.mark.parametrize('template', [
+    '<group name="i">\ninterface GigabitEthernet0/1 {{ status }}\n</group>',
+    '<group name="i">\n ip address {{ ip }} 255.255.255.0\n</group>',
+    '<group name="i">\ninterface GigabitEthernet0/1 {{ status | _exact_ }}\n</group>',
+    '<group name="h">\nhostname {{ hostname }}\n</group>',
+])
+def test_prefiltered_matches_unfiltered(template):
+    assert parse_prefiltered(template, DATA)[0] == parse_text(template, DATA)
+
+
+def test_prefilter_drops_unrelated_lines():
+    filtered, kept, total = Prefilter('<group name="h">\nhostname {{ hostname }}\n</group>').apply(DATA)
+    assert filtered == 'hostname R1'
+    assert (kept, total) == (1, 8)
+
+
+def test_required_literal():
+    assert required_literal('interface GigabitEthernet0/1 {{ status }}') == 'GigabitEthernet'
+    assert required_literal('interface GigabitEthernet0/1 {{ status | _exact_ }}') == 'GigabitEthernet0/1'
+    assert required_literal('vlan 10 {{ name }}') == 'vlan'
+    assert required_literal('10 {{ name }}') is None
+    assert required_literal('{{ line | _line_ }}') is None
+    assert required_literal('{{ role | set("core") }}') == ''
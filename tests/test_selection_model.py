@@ -0,0 +1,31 @@
+from PyQt6.QtCore import QPersistentModelIndex
+
+from ttpbuilder.Library.selection_model import SelectionModel
+
+
+def _names(model):
+    return [model.selection_at(row).name for row in range(model.rowCount())]
+
+
+def test_rename_resorts_by_name():
+    model = SelectionModel()
+    model.set_sort_order('Name')
+    first, second, third = model.add([(0, 2, 1, '{{a}}'), (3, 5, 1, '{{b}}'), (6, 8, 1, '{{c}}')])
+    held = QPersistentModelIndex(model.index(0))
+    model.set_ttp_text(first.key, '{{z}}')
+    assert _names(model) == ['b', 'c', 'z']
+    # The view's selection follows the renamed row
+    assert held.row() == 2
+
+
+def test_rename_reapplies_filter():
+    model = SelectionModel()
+    first, second = model.add([(0, 2, 1, '{{vlan}}'), (3, 5, 1, '{{port}}')])
+    model.set_filter('vlan')
+    assert _names(model) == ['vlan']
+    model.set_ttp_text(first.key, '{{interface}}')
+    assert _names(model) == []
+    model.set_ttp_text(second.key, '{{vlan_id}}')
+    assert _names(model) == ['vlan_id']
+    model.set_ttp_text(first.key, '{{vlan}}')
+    assert _names(model) == ['vlan', 'vlan_id']
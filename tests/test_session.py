@@ -0,0 +1,55 @@
+import pytest
+
+from ttpbuilder.Library.capture import Capture
+from ttpbuilder.Library.session import SessionJournal, append_delta, load_session, save_session
+
+TEXT = 'hostname R1\ninterface Gi1\n description café uplink\n'
+ROWS = [(9, 11, 1, '{{ hostname }}'), (22, 25, 2, '{{ interface }}')]
+
+
+def test_round_trip_pasted_text(tmp_path):
+    path = str(tmp_path / 'a.ttpsession')
+    save_session(path, Capture.from_text(TEXT), ROWS)
+    capture, rows = load_session(path)
+    assert capture.text() == TEXT
+    assert rows == ROWS
+
+
+def test_round_trip_mapped_file_keeps_byte_offsets(tmp_path):
+    source = tmp_path / 'capture.txt'
+    source.write_bytes(TEXT.encode('utf-8'))
+    mapped = Capture.from_file(str(source))
+    start = mapped.offset_of(2, mapped.line_text(2).index('uplink'))
+    rows = [(start, start + 6, 3, '{{ description }}')]
+    path = str(tmp_path / 'b.ttpsession')
+    save_session(path, mapped, rows)
+    mapped.close()
+
+    capture, loaded = load_session(path)
+    assert capture.is_mapped and capture.path == 'capture.txt'
+    assert capture.text() == TEXT
+    assert loaded == rows
+    assert capture.raw_slice(start, start + 6) == b'uplink'
+
+
+def test_deltas_replay_and_truncated_tail_is_ignored(tmp_path):
+    path = str(tmp_path / 'c.ttpsession')
+    save_session(path, Capture.from_text(TEXT), ROWS)
+    journal = SessionJournal()
+    journal.remove(9, 11)
+    journal.update(22, 25, '{{ name }}')
+    journal.add(0, 8, 1, '{{ keyword }}')
+    assert append_delta(path, journal)
+    assert not journal
+    with open(path, 'ab') as file:
+        file.write(b'D\xff\x00\x00\x00\x00\x00\x00\x00[')
+
+    _, rows = load_session(path)
+    assert rows == [(0, 8, 1, '{{ keyword }}'), (22, 25, 2, '{{ name }}')]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'capture.txt'
+    path.write_text(TEXT)
+    with pytest.raises(ValueError):
+        load_session(str(path))
@@ -0,0 +1,49 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from ttpbuilder.Library.sinks import ResultSink, flatten, open_sink
+
+RESULTS = [{'hostname': 'R1', 'vlans': [{'vlan': '10', 'ports': [{'port': 'Gi1'}, {'port': 'Gi2'}]},
+                                        {'vlan': '20'}]}]
+
+
+def test_flatten_repeats_enclosing_values():
+    assert list(flatten(RESULTS)) == [
+        ('vlans.ports', {'hostname': 'R1', 'vlans.vlan': '10', 'vlans.ports.port': 'Gi1'}),
+        ('vlans.ports', {'hostname': 'R1', 'vlans.vlan': '10', 'vlans.ports.port': 'Gi2'}),
+        ('vlans', {'hostname': 'R1', 'vlans.vlan': '20'}),
+    ]
+
+
+def test_result_sink_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        ResultSink(str(tmp_path / 'out'))
+
+
+def test_ndjson_sink_gzip(tmp_path):
+    path = str(tmp_path / 'out.ndjson.gz')
+    with open_sink('ndjson', path) as sink:
+        sink.write('a.txt', RESULTS)
+        sink.write('b.txt', None, error='ttp parser failed')
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        lines = [json.loads(line) for line in file]
+    assert lines == [{'capture': 'a.txt', 'results': RESULTS},
+                     {'capture': 'b.txt', 'results': None, 'error': 'ttp parser failed'}]
+    assert (sink.captures, sink.records) == (2, 2)
+
+
+def test_csv_sink_columns_from_first_capture(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    with open_sink('csv', path) as sink:
+        sink.write('bad.txt', None, error='failed')
+        sink.write('a.txt', [{'hostname': 'R1'}])
+        sink.write('b.txt', [{'hostname': 'R2', 'model': 'x'}])
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    assert rows == [['capture', 'group', 'hostname', 'error', 'extra'],
+                    ['bad.txt', '', '', 'failed', ''],
+                    ['a.txt', '', 'R1', '', ''],
+                    ['b.txt', '', 'R2', '', '{"model": "x"}']]
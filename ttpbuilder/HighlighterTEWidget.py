@@ -2,6 +2,45 @@ import re
 from PyQt6.QtGui import QColor, QTextCharFormat, QFont, QSyntaxHighlighter
 from PyQt6.QtCore import Qt
 
+from ttpbuilder.Library.literal_matcher import compile_literals
+
+# Rules per syntax type as (pattern, color, underline). Each type is merged into a
+# single alternation and compiled once, so a block is scanned in one pass.
+SYNTAX_RULES = {
+    "yaml": [
+        (r"\b[a-zA-Z_][a-zA-Z0-9_]*\b(?=\s*:)", Qt.GlobalColor.green, False),  # Match keys before colon
+    ],
+    "json": [
+        (r"\".*?\": ", Qt.GlobalColor.yellow, False),  # Match key-value pair structure of JSON
+    ],
+    "jinja": [
+        (r"\{\{.*?\}\}", Qt.GlobalColor.darkCyan, True),  # Match Jinja2-style variable syntax
+        (r"\{%\s*for.*?%\}", Qt.GlobalColor.green, False),  # Match Jinja2-style for loop syntax
+        (r"\{%\s*(?:if|elif|else).*?%\}", Qt.GlobalColor.blue, False),  # Match Jinja2-style if/elif/else syntax
+        (r"\{%\s*end(?:for|if).*?%\}", Qt.GlobalColor.green, False),  # Match Jinja2-style endfor/endif syntax
+    ],
+}
+
+_compiled_rules = {}
+
+
+def compile_rules(syntax_type):
+    if syntax_type not in _compiled_rules:
+        rules = SYNTAX_RULES[syntax_type]
+        pattern = "|".join(f"(?P<r{i}>{rule[0]})" for i, rule in enumerate(rules))
+        _compiled_rules[syntax_type] = (re.compile(pattern), rules)
+    return _compiled_rules[syntax_type]
+
+
+def make_format(color, underline=False):
+    format = QTextCharFormat()
+    format.setFontWeight(QFont.Weight.Bold)
+    format.setForeground(color)
+    if underline:
+        format.setUnderlineStyle(QTextCharFormat.UnderlineStyle.SingleUnderline)
+    return format
+
+
 class SyntaxHighlighter(QSyntaxHighlighter):
 
     def __init__(self, document):
@@ -10,6 +49,11 @@ class SyntaxHighlighter(QSyntaxHighlighter):
         # Keywords
         self.keywords = []
         self.syntax_type = None  # Added syntax type attribute
+        self._expression = None
+        self._formats = {}
+        self._keyword_source = None
+        self._keyword_expression = None
+        self._keyword_format = make_format(Qt.GlobalColor.darkMagenta)
 
     def load_keywords_from_file(self, file_path):
         with open(file_path, 'r') as file:
@@ -17,75 +61,35 @@ class SyntaxHighlighter(QSyntaxHighlighter):
 
     def set_syntax_type(self, syntax_type):  # Added setter for syntax type
         self.syntax_type = syntax_type
+        self._expression = None
+        if syntax_type in SYNTAX_RULES:
+            self._expression, rules = compile_rules(syntax_type)
+            self._formats = {f"r{i}": make_format(color, underline) for i, (_, color, underline) in enumerate(rules)}
 
     def highlightBlock(self, text):
         if self.syntax_type == "keyword":
             self.highlight_keywords(text)
-        elif self.syntax_type == "yaml":
-            self.highlight_yaml(text)
-        elif self.syntax_type == "json":
-            self.highlight_json(text)
-        elif self.syntax_type == "jinja":
-            self.highlight_jinja(text)
+        elif self._expression is not None:
+            self.highlight_expression(text, self._expression)
 
     def highlight_keywords(self, text):
-        format = QTextCharFormat()
-        format.setFontWeight(QFont.Weight.Bold)
-        format.setForeground(Qt.GlobalColor.darkMagenta)
-
-        for keyword in self.keywords:
-            pattern = f"\\b{keyword}\\b"
-            self.highlight_pattern(text, pattern, format)
-
-    def highlight_yaml(self, text):
-        format = QTextCharFormat()
-        format.setFontWeight(QFont.Weight.Bold)
-        format.setForeground(Qt.GlobalColor.green)
-        pattern = r"\b[a-zA-Z_][a-zA-Z0-9_]*\b(?=\s*:)"  # Match keys before colon
-        self.highlight_pattern(text, pattern, format)
-
-    def highlight_json(self, text):
-        format = QTextCharFormat()
-        format.setFontWeight(QFont.Weight.Bold)
-        format.setForeground(Qt.GlobalColor.yellow)
-        pattern = r"\".*?\": "  # Match key-value pair structure of JSON
-        self.highlight_pattern(text, pattern, format)
-
-    def highlight_jinja(self, text):
-        format1 = QTextCharFormat()
-        format1.setFontWeight(QFont.Weight.Bold)
-        format1.setForeground(Qt.GlobalColor.darkCyan)
-        format1.setUnderlineStyle(QTextCharFormat.UnderlineStyle.SingleUnderline)
-        pattern1 = r"\{\{.*?\}\}"  # Match Jinja2-style variable syntax
-        self.highlight_pattern(text, pattern1, format1)
-
-        format2 = QTextCharFormat()
-        format2.setFontWeight(QFont.Weight.Bold)
-        format2.setForeground(Qt.GlobalColor.green)
-        pattern2 = r"\{%\s*for.*?%\}"  # Match Jinja2-style for loop syntax
-        self.highlight_pattern(text, pattern2, format2)
-
-        format3 = QTextCharFormat()
-        format3.setFontWeight(QFont.Weight.Bold)
-        format3.setForeground(Qt.GlobalColor.blue)
-        pattern3 = r"\{%\s*(if|elif|else).*?%\}"  # Match Jinja2-style if/elif/else syntax
-        self.highlight_pattern(text, pattern3, format3)
-
-        format4 = QTextCharFormat()
-        format4.setFontWeight(QFont.Weight.Bold)
-        format4.setForeground(Qt.GlobalColor.green)
-        pattern4 = r"\{%\s*end(for|if).*?%\}"  # Match Jinja2-style endfor/endif syntax
-        self.highlight_pattern(text, pattern4, format4)
-
-    def highlight_pattern(self, text, pattern, format):
-        expression = re.compile(pattern)
-        index = expression.search(text)
-
-        while index:
-            start, end = index.span()
-            length = end - start
-            self.setFormat(start, length, format)
-            index = expression.search(text, start + length)
+        # Keywords are matched as literal words through one trie-shaped regex,
+        # rebuilt only when the keyword list changes
+        if self._keyword_source != self.keywords:
+            self._keyword_source = list(self.keywords)
+            self._keyword_expression = compile_literals(self.keywords, word_boundaries=True)
+        if self._keyword_expression is None:
+            return
+        for match in self._keyword_expression.finditer(text):
+            start, end = match.span()
+            self.setFormat(start, end - start, self._keyword_format)
+
+    def highlight_expression(self, text, expression):
+        formats = self._formats
+        for match in expression.finditer(text):
+            start, end = match.span()
+            if end > start:
+                self.setFormat(start, end - start, formats[match.lastgroup])
 
 if __name__ == '__main__':
     import sys
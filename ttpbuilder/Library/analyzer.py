@@ -0,0 +1,86 @@
+# analyzer.py
+# Per-line cost analysis of a template. Every template line is compiled by ttp
+# itself, then its regex is timed over the sample the way ttp runs it: one
+# finditer over the whole input. Runs in the parse worker, no PyQt6 here.
+import time
+
+from ttpbuilder.Library.core import load_ttp
+from ttpbuilder.Library.template_lines import tag_name
+
+# Lines inside any other tag (vars, macro, input, doc...) are not match lines
+MATCH_LINE_TAGS = {'group', 'template'}
+GREEDY_PATTERNS = ('ORPHRASE', 'PHRASE', 'ROW', '_line_', '.*', '.+')
+# Time a regex at least this long, repeating fast ones, for a stable figure
+MIN_SAMPLE_SECONDS = 0.005
+MAX_REPEATS = 20
+# Matches above this share of the sample lines are flagged
+BROAD_MATCH_RATIO = 0.5
+
+
+def match_lines(template):
+    # [(line_index, text)] for the lines ttp turns into regexes
+    lines = []
+    open_tags = []
+    for index, line in enumerate(template.splitlines()):
+        name = tag_name(line)
+        if name is not None:
+            stripped = line.strip()
+            if stripped.startswith('</'):
+                if open_tags:
+                    open_tags.pop()
+            elif not stripped.endswith('/>'):
+                open_tags.append(name)
+            continue
+        if line.strip() and all(tag in MATCH_LINE_TAGS for tag in open_tags):
+            lines.append((index, line))
+    return lines
+
+
+def line_regexes(template):
+    # [(line_index, text, compiled regex)] compiled by ttp in one go: each line
+    # becomes its own group so the group name maps the regex back to the line
+    lines = match_lines(template)
+    wrapped = '\n'.join(f'<group name="l{index}">\n{line}\n</group>' for index, line in lines)
+    parser = load_ttp()(template=wrapped)
+    regexes = {}
+    for group in parser._templates[0].groups:
+        entries = group.start_re or group.re
+        if entries:
+            regexes[int(group.name[1:])] = entries[0]['REGEX']
+    return [(index, line, regexes[index]) for index, line in lines if index in regexes]
+
+
+def line_warnings(text, attempts, matches):
+    warnings = []
+    if any(pattern in text for pattern in GREEDY_PATTERNS):
+        warnings.append('greedy pattern')
+    if not text.split('{{', 1)[0].strip():
+        warnings.append('starts with a variable')
+    if attempts and matches > attempts * BROAD_MATCH_RATIO:
+        warnings.append(f"matches {matches / attempts:.0%} of lines")
+    return warnings
+
+
+def analyze(template, data):
+    # One dict per match line with attempts (sample lines the anchored regex
+    # is tried at), matches and scan seconds, in template order
+    text = "\n" + data + "\n\n"
+    attempts = data.count('\n') + 1
+    report = []
+    for index, line, regex in line_regexes(template):
+        repeats = 0
+        elapsed = 0.0
+        while repeats < MAX_REPEATS and (repeats == 0 or elapsed < MIN_SAMPLE_SECONDS):
+            started = time.perf_counter()
+            matches = sum(1 for _ in regex.finditer(text))
+            elapsed += time.perf_counter() - started
+            repeats += 1
+        report.append({
+            'line': index,
+            'text': line,
+            'attempts': attempts,
+            'matches': matches,
+            'seconds': elapsed / repeats,
+            'warnings': line_warnings(line, attempts, matches),
+        })
+    return report
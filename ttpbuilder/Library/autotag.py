@@ -0,0 +1,88 @@
+# autotag.py
+# Bulk auto-tagging: one combined regex pass over the capture proposes named
+# selections for addresses, interfaces and numbers, with an inferred TTP
+# match type. No Qt imports; the GUI streams the batches into the list.
+import re
+
+# (kind, TTP match type, pattern), tried in this order at each position
+TOKEN_PATTERNS = [
+    ('mac', 'MAC', r'(?:[0-9a-fA-F]{4}\.){2}[0-9a-fA-F]{4}|(?:[0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}'),
+    ('prefix', 'PREFIX', r'(?:\d{1,3}\.){3}\d{1,3}/\d{1,2}'),
+    ('ip', 'IP', r'(?:\d{1,3}\.){3}\d{1,3}'),
+    ('interface', None, r'[A-Za-z][A-Za-z-]*\d+(?:/\d+)+(?:[.:]\d+)?'
+                        r'|(?:Vlan|Loopback|Tunnel|Port-channel|Po|Lo|Vl|Tu|ae|irb|lo)\d+(?:\.\d+)?'),
+    ('number', 'DIGIT', r'\d+'),
+]
+
+MATCH_TYPES = {kind: match_type for kind, match_type, _ in TOKEN_PATTERNS}
+
+# Tokens must stand alone, so digits inside words like "Gi0" or "ipv4" are left alone
+TOKEN_REGEX = re.compile(
+    r'(?<![^\s,(\[<=])(?:' +
+    '|'.join(f'(?P<{kind}>{pattern})' for kind, _, pattern in TOKEN_PATTERNS) +
+    r')(?![^\s,)\]>;:])'
+)
+
+_PRECEDING_WORD = re.compile(r'([A-Za-z][A-Za-z0-9_-]*)[\s:=]*$')
+_NAME_CHARS = re.compile(r'[^a-z0-9_]+')
+
+
+class Proposal:
+    __slots__ = ('start', 'end', 'line', 'name', 'match_type', 'text')
+
+    def __init__(self, start, end, line, name, match_type, text):
+        self.start = start
+        self.end = end
+        self.line = line
+        self.name = name
+        self.match_type = match_type
+        self.text = text
+
+    @property
+    def ttp_text(self):
+        if self.match_type:
+            return f"{{{{{self.name} | {self.match_type}}}}}"
+        return f"{{{{{self.name}}}}}"
+
+
+def _name_for(kind, text, line_start, start):
+    # Numbers are named after the keyword in front of them ("vlan 10" -> vlan)
+    if kind == 'number':
+        preceding = _PRECEDING_WORD.search(text, line_start, start)
+        if preceding:
+            name = _NAME_CHARS.sub('_', preceding.group(1).lower()).strip('_')
+            if name:
+                return name
+    return kind
+
+
+def propose(capture, lines_per_batch=2000):
+    # Yields lists of Proposals, one list per batch of lines. Each batch is a
+    # raw slice of the capture, so match offsets plus the base are capture offsets.
+    for first_line in range(0, capture.line_count, lines_per_batch):
+        last_line = min(first_line + lines_per_batch, capture.line_count)
+        base = capture.line_start(first_line)
+        text = capture.raw_text(first_line, last_line)
+
+        batch = []
+        line = first_line
+        line_start = 0
+        used_names = {}
+        for match in TOKEN_REGEX.finditer(text):
+            start, end = match.span()
+            newline = text.rfind('\n', line_start, start)
+            if newline != -1:
+                line_start = newline + 1
+                line = capture.line_of(base + line_start)
+                used_names = {}
+
+            kind = match.lastgroup
+            name = _name_for(kind, text, line_start, start)
+            # Keep variable names unique within a line
+            count = used_names.get(name, 0) + 1
+            used_names[name] = count
+            if count > 1:
+                name = f"{name}_{count}"
+
+            batch.append(Proposal(base + start, base + end, line, name, MATCH_TYPES[kind], match.group()))
+        yield batch
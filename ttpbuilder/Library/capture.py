@@ -0,0 +1,138 @@
+# capture.py
+# Line-offset index over the sample text, either pasted text or a memory-mapped
+# file. Named selections are stored as absolute offsets into the capture, so
+# the editor only ever has to hold a window of lines.
+import glob
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+
+_NEWLINE = re.compile(b'\n')
+
+
+def collect_captures(paths, pattern='*'):
+    # Expand directories and glob patterns into a sorted, de-duplicated file list
+    captures = set()
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '**', pattern), recursive=True)
+        else:
+            matches = glob.glob(path)
+        captures.update(match for match in matches if os.path.isfile(match))
+    return sorted(captures)
+
+
+class Capture:
+    def __init__(self, buffer, line_starts, length, path=None):
+        self._buffer = buffer
+        self._line_starts = line_starts
+        self.length = length
+        self.path = path
+
+    @classmethod
+    def from_text(cls, text):
+        line_starts = array('q', [0])
+        line_starts.extend(match.end() for match in re.finditer('\n', text))
+        return cls(text, line_starts, len(text))
+
+    @classmethod
+    def from_file(cls, path):
+        # Offsets into a file are byte offsets. Internally its bytes are read
+        # as latin-1, one character per byte; text handed out is UTF-8.
+        with open(path, 'rb') as file:
+            size = file.seek(0, 2)
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        return cls.from_buffer(buffer, path)
+
+    @classmethod
+    def from_buffer(cls, buffer, path=None):
+        line_starts = array('q', [0])
+        line_starts.extend(match.end() for match in _NEWLINE.finditer(buffer))
+        return cls(buffer, line_starts, len(buffer), path)
+
+    @property
+    def is_mapped(self):
+        return not isinstance(self._buffer, str)
+
+    @property
+    def line_count(self):
+        return len(self._line_starts)
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def text_at(self, start, end):
+        # Offset-faithful text: for files one latin-1 character per byte
+        chunk = self._buffer[start:end]
+        return chunk if isinstance(chunk, str) else chunk.decode('latin-1')
+
+    def decode(self, text):
+        # UTF-8 text of what text_at returned, for display and parsing
+        return text.encode('latin-1').decode('utf-8', errors='replace') if self.is_mapped else text
+
+    def raw_slice(self, start, end):
+        # Undecoded slice of the buffer: str for pasted text, bytes for files
+        return self._buffer[start:end]
+
+    def line_start(self, line):
+        return self._line_starts[line]
+
+    def line_end(self, line):
+        # End of the line's text, excluding the newline and any carriage return
+        if line + 1 < len(self._line_starts):
+            end = self._line_starts[line + 1] - 1
+        else:
+            end = self.length
+        if end > self._line_starts[line] and self.text_at(end - 1, end) == '\r':
+            end -= 1
+        return end
+
+    def line_of(self, offset):
+        # 0-based line number containing offset
+        return bisect_right(self._line_starts, offset) - 1
+
+    def line_text(self, line):
+        return self.decode(self.text_at(self._line_starts[line], self.line_end(line)))
+
+    def column_of(self, line, offset):
+        # Column in line_text(line) of a capture offset on that line
+        start = self._line_starts[line]
+        if not self.is_mapped:
+            return offset - start
+        return len(self.decode(self.text_at(start, offset)))
+
+    def offset_of(self, line, column):
+        # Capture offset of a column in line_text(line), the inverse of column_of
+        start = self._line_starts[line]
+        if not self.is_mapped:
+            return start + column
+        # Decoded length only grows with the bytes, search for the first
+        # byte count whose text reaches the column
+        raw = self.text_at(start, self.line_end(line))
+        low, high = 0, len(raw)
+        while low < high:
+            middle = (low + high) // 2
+            if len(self.decode(raw[:middle])) < column:
+                low = middle + 1
+            else:
+                high = middle
+        return start + low
+
+    def raw_text(self, first_line, last_line):
+        # Unmodified, offset-faithful text of the lines, so that offsets into
+        # it plus line_start(first_line) are capture offsets
+        end = self._line_starts[last_line] if last_line < self.line_count else self.length
+        return self.text_at(self._line_starts[first_line], end)
+
+    def text(self, first_line=0, last_line=None):
+        # Text of lines first_line up to (not including) last_line, joined with '\n'
+        if last_line is None or last_line > self.line_count:
+            last_line = self.line_count
+        if first_line >= last_line:
+            return ''
+        end = self.line_end(last_line - 1)
+        text = self.decode(self.text_at(self._line_starts[first_line], end))
+        return text.replace('\r\n', '\n') if '\r' in text else text
@@ -0,0 +1,186 @@
+# chunked.py
+# Parallel parsing of huge captures. The capture is cut at record boundaries,
+# lines where one of the template's top level groups starts (or, failing
+# that, device prompts or blank lines), the chunks are parsed separately and
+# the per-chunk results are merged into the shape a single parse gives.
+# No Qt imports; the pool is supplied by the caller as a map function.
+import os
+import re
+
+from ttpbuilder.Library.core import first_difference, load_ttp, parse_text, parser_cache
+from ttpbuilder.Library.prefilter import get_prefilter
+from ttpbuilder.Library.timing import NULL_TIMER
+
+# Smaller chunks cost more in per-job overhead than they win in balance
+MIN_CHUNK_LINES = 20000
+CHUNKS_PER_WORKER = 2
+# Lines looked at, at first, after a target cut for a boundary
+SEARCH_LINES = 2000
+PROMPT_REGEX = re.compile(r'\n[\w.\-@/:()~]+[#>$%][ \t]*\S')
+BLANK_REGEX = re.compile(r'\n[ \t]*(?=\r?\n)')
+STRATEGIES = ('auto', 'group', 'prompt', 'blank')
+# Groups whose matches go to the top level of the results: the "_" group and
+# the implicit group of lines outside any group
+TOP_LEVEL_GROUPS = ('_', '_anonymous_')
+
+
+def serial_reason(template):
+    # Why the template can't be parsed in chunks, or None. A top level group
+    # only starts at its first line, so a chunk without that line would miss
+    # all its other lines; per_template results are one dict for all input.
+    ttp_template = load_ttp()(template=template)._templates[0]
+    if ttp_template.results_method == 'per_template':
+        return 'per_template results'
+    if any(group.name in TOP_LEVEL_GROUPS for group in ttp_template.groups):
+        return 'top level matches'
+    return None
+
+
+def group_start_regexes(template):
+    # Start regexes of the top level groups
+    parser = load_ttp()(template=template)
+    regexes = []
+    for group in parser._templates[0].groups:
+        regexes.extend(entry['REGEX'] for entry in group.start_re)
+    return regexes
+
+
+def boundary_regexes(template, strategy='auto'):
+    # (strategy used, regexes matching a "\n" followed by a line that may start a chunk)
+    if strategy in ('auto', 'group'):
+        regexes = group_start_regexes(template)
+        if regexes or strategy == 'group':
+            return 'group', regexes
+        strategy = 'prompt'
+    return strategy, [PROMPT_REGEX if strategy == 'prompt' else BLANK_REGEX]
+
+
+def _find_boundary(capture, regexes, first_line, last_line):
+    # First line in [first_line, last_line) that starts a record, else None.
+    # The window doubles so a boundary near the target is found cheaply.
+    size = SEARCH_LINES
+    while first_line < last_line:
+        window_end = min(first_line + size, last_line)
+        window = '\n' + capture.text(first_line, window_end) + '\n'
+        positions = [match.start() for match in (regex.search(window) for regex in regexes) if match]
+        if positions:
+            line = first_line + window.count('\n', 0, min(positions))
+            if line < window_end:
+                return line
+        first_line = window_end
+        size *= 2
+    return None
+
+
+def chunk_lines_for(line_count, workers=None):
+    workers = workers or os.cpu_count() or 1
+    return max(MIN_CHUNK_LINES, -(-line_count // (workers * CHUNKS_PER_WORKER)))
+
+
+def plan_chunks(template, capture, chunk_lines, strategy='auto'):
+    # Returns (strategy used, [(first_line, last_line)]) covering the capture
+    strategy, regexes = boundary_regexes(template, strategy)
+    cuts = [0]
+    target = chunk_lines
+    while regexes and target < capture.line_count:
+        boundary = _find_boundary(capture, regexes, max(target, cuts[-1] + 1), capture.line_count)
+        if boundary is None:
+            break
+        cuts.append(boundary)
+        target = boundary + chunk_lines
+    cuts.append(capture.line_count)
+    return strategy, list(zip(cuts, cuts[1:]))
+
+
+def _is_scalar(value):
+    return not isinstance(value, (dict, list))
+
+
+def _merge_values(first, second):
+    # ttp saves a repeated path as a list, so records from two chunks become a
+    # list. Dicts keyed by a dynamic path (no scalar values) merge key by key,
+    # and scalars, as from the "_" group, keep the last value like ttp does.
+    if isinstance(first, list):
+        return first + (second if isinstance(second, list) else [second])
+    if isinstance(first, dict) and isinstance(second, dict):
+        if not any(_is_scalar(value) for value in first.values()) and \
+                not any(_is_scalar(value) for value in second.values()):
+            merged = dict(first)
+            for key, value in second.items():
+                merged[key] = _merge_values(merged[key], value) if key in merged else value
+            return merged
+        return [first, second]
+    if isinstance(first, dict):
+        return [first] + second if isinstance(second, list) else second
+    return second
+
+
+def merge_results(parts):
+    # parts are parse_text results of consecutive chunks, one input each
+    merged = None
+    for part in parts:
+        item = part[0] if part else None
+        if not item:
+            continue
+        if merged is None:
+            merged = item
+        elif isinstance(merged, list):
+            # Templates without groups give a list of records per input
+            merged = merged + (item if isinstance(item, list) else [item])
+        else:
+            merged = dict(merged)
+            for key, value in item.items():
+                merged[key] = _merge_values(merged[key], value) if key in merged else value
+    return [merged if merged is not None else {}]
+
+
+def parse_chunk(job):
+    # Pool task: (template, text, prefilter) -> results, reusing the process's
+    # parser cache. Chunks start on lines so no UTF-8 sequence is cut in two.
+    template, text, prefilter = job
+    if prefilter:
+        text = get_prefilter(template).apply(text)[0]
+    return parse_text(template, text, cache=parser_cache)
+
+
+def parse_chunked(template, capture, map_function, workers=None, chunk_lines=None, strategy='auto',
+                  verify=False, prefilter=False, progress=None, timer=NULL_TIMER):
+    # map_function(parse_chunk, jobs) must yield results in order, e.g.
+    # ProcessPoolExecutor.map or Pool.imap. Returns (results, info). Templates
+    # that can't be cut up are parsed in one piece, info['serial'] says why.
+    with timer.stage('plan chunks'):
+        serial_because = serial_reason(template)
+        if serial_because:
+            strategy, chunks = 'serial', [(0, capture.line_count)]
+            # The one piece is the serial parse, there is nothing to check it against
+            verify = False
+        else:
+            strategy, chunks = plan_chunks(template, capture,
+                                           chunk_lines or chunk_lines_for(capture.line_count, workers), strategy)
+    jobs = ((template, capture.text(first, last), prefilter) for first, last in chunks)
+    if verify:
+        # The plain serial parse runs in the pool as one more job, alongside the chunks
+        jobs = iter([(template, capture.text(), False)] + list(jobs))
+
+    parts = []
+    serial = None
+    with timer.stage('parse chunks'):
+        for done, part in enumerate(map_function(parse_chunk, jobs), 0 if verify else 1):
+            if verify and serial is None:
+                serial = part
+                continue
+            parts.append(part)
+            if progress:
+                progress(done, len(chunks))
+    with timer.stage('merge'):
+        merged = parts[0] if serial_because else merge_results(parts)
+
+    info = {'chunks': len(chunks), 'strategy': strategy, 'serial': serial_because, 'prefiltered': prefilter,
+            'verified': verify, 'mismatch': None}
+    if verify:
+        with timer.stage('verify'):
+            info['mismatch'] = first_difference(merged, serial)
+        # On a mismatch the serial parse is the one to trust
+        if info['mismatch']:
+            merged = serial
+    return merged, info
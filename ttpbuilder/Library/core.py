@@ -0,0 +1,157 @@
+# core.py
+# ttp invocation and parser caching. Nothing in here may import PyQt6, the
+# batch entry point runs this on headless servers.
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ttpbuilder.Library.timing import NULL_TIMER
+
+
+def load_ttp():
+    # ttp is only imported once something is parsed, the GUI starts without it
+    from ttp import ttp
+    return ttp
+
+
+def template_hash(template):
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()
+
+
+def _snapshot_vars(parser):
+    # record() leaves values in the template vars and in ttp's global vars,
+    # where the next parse of a cached parser would find them
+    return [copy.deepcopy(template.vars) for template in parser._templates], \
+        copy.deepcopy(parser._ttp_['global_vars'])
+
+
+def _restore_vars(parser, snapshot):
+    # In place, groups and child objects hold references to these dicts
+    template_vars, global_vars = snapshot
+    for template, saved in zip(parser._templates, template_vars):
+        template.vars.clear()
+        template.vars.update(copy.deepcopy(saved))
+    parser._ttp_['global_vars'].clear()
+    parser._ttp_['global_vars'].update(copy.deepcopy(global_vars))
+
+
+class ParserCache:
+    # LRU cache of compiled ttp parser objects keyed by template content hash.
+    # Building a ttp object parses the template XML and compiles every regex,
+    # so a cached parser is only fed new input.
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._parsers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._parsers)
+
+    def _get(self, template, timer=NULL_TIMER):
+        key = template_hash(template)
+        with self._lock:
+            entry = self._parsers.get(key)
+            if entry is not None:
+                self._parsers.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        with timer.stage('compile'):
+            parser = load_ttp()(template=template)
+            entry = (parser, threading.Lock(), _snapshot_vars(parser))
+        with self._lock:
+            entry = self._parsers.setdefault(key, entry)
+            while len(self._parsers) > self.max_size:
+                self._parsers.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def warm(self, template):
+        # Compile ahead of the first parse
+        self._get(template)
+
+    def parse(self, template, data, timer=NULL_TIMER):
+        parser, parser_lock, snapshot = self._get(template, timer)
+        # A ttp object holds its inputs and results, so only one parse may use it at a time
+        with parser_lock, timer.stage('parse'):
+            try:
+                parser.add_input(data)
+                parser.parse(one=True)
+                # clear_result() empties ttp's own results in place, hand back a copy. It is a
+                # list per input, or a dict for results="per_template".
+                return copy.copy(parser.result()[0])
+            finally:
+                parser.clear_input()
+                parser.clear_result()
+                _restore_vars(parser, snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._parsers.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._parsers), 'max_size': self.max_size}
+
+
+parser_cache = ParserCache()
+
+
+def parse_text(template, data, cache=None, result_cache=None, timer=NULL_TIMER):
+    # Returns the native results for a single input, the same structure
+    # ttp's result(format="json")[0] serializes. Stages are recorded on timer.
+    if result_cache is not None:
+        with timer.stage('result cache lookup'):
+            key = result_cache.key(template, data)
+            found, results = result_cache.get(key)
+        if found:
+            return results
+
+    if cache is not None:
+        results = cache.parse(template, data, timer)
+    else:
+        with timer.stage('compile'):
+            parser = load_ttp()(template=template)
+        with timer.stage('parse'):
+            parser.add_input(data)
+            parser.parse(one=True)
+            results = parser.result()[0]
+
+    if result_cache is not None:
+        with timer.stage('result cache store'):
+            result_cache.put(key, results)
+    return results
+
+
+def read_capture(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        return file.read()
+
+
+def first_difference(first, second, path='results'):
+    # Path of the first place two result structures differ, or None. first is
+    # the result being checked, second the plain parse it should equal.
+    if type(first) is not type(second):
+        return f"{path}: {type(first).__name__} != {type(second).__name__}"
+    if isinstance(first, dict):
+        for key in first.keys() | second.keys():
+            if key not in first or key not in second:
+                return f"{path}.{key}: {'unexpected' if key in first else 'missing'}"
+            difference = first_difference(first[key], second[key], f"{path}.{key}")
+            if difference:
+                return difference
+        return None
+    if isinstance(first, list):
+        for index, (a, b) in enumerate(zip(first, second)):
+            difference = first_difference(a, b, f"{path}[{index}]")
+            if difference:
+                return difference
+        if len(first) != len(second):
+            return f"{path}: {len(first)} items != {len(second)}"
+        return None
+    return None if first == second else f"{path}: {first!r} != {second!r}"
@@ -0,0 +1,140 @@
+# coverage.py
+# Corpus coverage: how well a template's variables are filled on each capture
+# of a corpus. The variables and the groups holding them come from the
+# template; a capture's fill rate for a variable is the share of its group's
+# matches that set it. Runs in pool workers, no Qt imports.
+import re
+import time
+
+from ttpbuilder.Library.analyzer import MATCH_LINE_TAGS
+from ttpbuilder.Library.core import parse_text, parser_cache, read_capture
+from ttpbuilder.Library.prefilter import parse_prefiltered
+from ttpbuilder.Library.template_lines import split_line, tag_name, variable_filters, variable_name
+
+NAME_ATTRIBUTE = re.compile(r'''\bname\s*=\s*(?:"([^"]*)"|'([^']*)')''')
+# Matches any key, for dynamic path segments such as {{ interface }}
+WILDCARD = '*'
+
+
+def _group_path(line):
+    # (path segments, path variables) a <group> tag adds. "_" and unnamed
+    # groups add no segment, a trailing * or ** only tells ttp to make a list.
+    # Variables in a dynamic segment become keys, never fields.
+    match = NAME_ATTRIBUTE.search(line)
+    name = (match.group(1) or match.group(2) or '') if match else ''
+    segments = []
+    variables = set()
+    for segment in re.split(r'\.(?![^{]*\}\})', name):
+        segment = segment.strip().rstrip('*')
+        if '{{' in segment:
+            segments.append(WILDCARD)
+            variables.update(variable_name(text) for is_variable, text in split_line(segment) if is_variable)
+        elif segment and segment != '_':
+            segments.append(segment)
+    return tuple(segments), variables
+
+
+def template_columns(template):
+    # [(group path, variable)] in template order. Ignored variables and
+    # _headers_ lines, whose fields are named by the capture, are left out.
+    columns = []
+    open_tags = []
+    for line in template.splitlines():
+        name = tag_name(line)
+        if name is not None:
+            stripped = line.strip()
+            if stripped.startswith('</'):
+                if open_tags:
+                    open_tags.pop()
+            elif not stripped.endswith('/>'):
+                path, path_variables = open_tags[-1][1:] if open_tags else ((), frozenset())
+                if name == 'group':
+                    segments, variables = _group_path(line)
+                    path, path_variables = path + segments, path_variables | variables
+                open_tags.append((name, path, path_variables))
+            continue
+        if not line.strip() or not all(tag in MATCH_LINE_TAGS for tag, _, _ in open_tags):
+            continue
+        path, path_variables = open_tags[-1][1:] if open_tags else ((), frozenset())
+        for is_variable, text in split_line(line):
+            if not is_variable:
+                continue
+            variable = variable_name(text)
+            filters = variable_filters(text)
+            if variable.startswith('ignore') or variable in path_variables or '_headers_' in filters \
+                    or 'ignore' in filters:
+                continue
+            if (path, variable) not in columns:
+                columns.append((path, variable))
+    return columns
+
+
+def column_label(column):
+    path, variable = column
+    return '.'.join((*path, variable))
+
+
+def _tally(value, path, tallies):
+    # tallies: path -> [matches, {variable: times set}]
+    if isinstance(value, list):
+        for item in value:
+            _tally(item, path, tallies)
+        return
+    # ttp gives an empty dict for an input nothing matched
+    if not isinstance(value, dict) or not value:
+        return
+    entry = tallies.setdefault(path, [0, {}])
+    entry[0] += 1
+    for key, item in value.items():
+        if isinstance(item, dict) or (isinstance(item, list) and any(isinstance(i, dict) for i in item)):
+            _tally(item, (*path, key), tallies)
+        elif item not in ('', None):
+            entry[1][key] = entry[1].get(key, 0) + 1
+
+
+def _matches(pattern, path):
+    return len(pattern) == len(path) and all(a == WILDCARD or a == b for a, b in zip(pattern, path))
+
+
+def capture_coverage(columns, results):
+    # (matches of the template's groups, fill rate per column)
+    tallies = {}
+    _tally(results, (), tallies)
+    groups = {path for path, _ in columns}
+    counts = {group: [0, {}] for group in groups}
+    for path, (matches, filled) in tallies.items():
+        for group in groups:
+            if _matches(group, path):
+                counts[group][0] += matches
+                for key, times in filled.items():
+                    counts[group][1][key] = counts[group][1].get(key, 0) + times
+    fills = []
+    for path, variable in columns:
+        matches, filled = counts[path]
+        fills.append(filled.get(variable, 0) / matches if matches else 0.0)
+    return sum(matches for matches, _ in counts.values()), fills
+
+
+def measure_capture(job):
+    # Pool worker: parse one capture and report its coverage row. The template
+    # is compiled before the clock starts, every capture pays only its parse.
+    template, columns, path, prefilter = job
+    row = {'capture': path, 'lines': 0, 'seconds': 0.0, 'records': 0, 'coverage': 0.0,
+           'fills': [0.0] * len(columns), 'error': None}
+    try:
+        data = read_capture(path)
+        row['lines'] = data.count('\n') + 1
+        parser_cache.warm(template)
+        started = time.perf_counter()
+        if prefilter:
+            results = parse_prefiltered(template, data, cache=parser_cache)[0]
+        else:
+            results = parse_text(template, data, cache=parser_cache)
+        row['seconds'] = time.perf_counter() - started
+    except Exception as e:
+        row['error'] = f"ttp parser failed: {e}"
+        return row
+    row['records'], row['fills'] = capture_coverage(columns, results)
+    if columns:
+        row['coverage'] = sum(row['fills']) / len(columns)
+    return row
@@ -0,0 +1,75 @@
+# grouping.py
+# Repeated-block detection. Template lines are reduced to shapes (literal
+# words vs. variable spans); runs where a block of shapes repeats back to back
+# are replaced by a single <group> built from the first block.
+import re
+
+from ttpbuilder.Library.template_lines import line_literals, line_shape, line_variables
+
+MAX_PERIOD = 32
+_NAME_CHARS = re.compile(r'[^A-Za-z0-9_]+')
+
+
+def find_repeats(shape_ids, max_period=MAX_PERIOD, min_repeats=2):
+    # Yields (start, period, repeats) for each collapsible run, left to right.
+    # The period covering the most lines wins, ties go to the shorter period.
+    count = len(shape_ids)
+    i = 0
+    while i < count:
+        best = None
+        for period in range(1, min(max_period, (count - i) // 2) + 1):
+            block = shape_ids[i:i + period]
+            repeats = 1
+            while shape_ids[i + repeats * period:i + (repeats + 1) * period] == block:
+                repeats += 1
+            if repeats >= min_repeats and (best is None or period * repeats > best[0] * best[1]):
+                best = (period, repeats)
+        if best:
+            yield i, best[0], best[1]
+            i += best[0] * best[1]
+        else:
+            i += 1
+
+
+def _group_name(block, used_names):
+    words = line_literals(block[0]) or line_variables(block[0]) or ['group']
+    name = _NAME_CHARS.sub('_', words[0]).strip('_').lower() or 'group'
+    candidate = name
+    suffix = 2
+    while candidate in used_names:
+        candidate = f"{name}_{suffix}"
+        suffix += 1
+    used_names.add(candidate)
+    return candidate
+
+
+def collapse_repeats(lines, max_period=MAX_PERIOD, min_repeats=2, shapes=None):
+    # Hash each shape once; blocks are then compared as lists of small ints.
+    # shapes, when given, are the lines' precomputed line_shape()s.
+    shape_ids = []
+    known_shapes = {}
+    for shape in shapes if shapes is not None else map(line_shape, lines):
+        shape_ids.append(known_shapes.setdefault(shape, len(known_shapes)))
+
+    repeats_found = list(find_repeats(shape_ids, max_period, min_repeats))
+    if not repeats_found:
+        return list(lines)
+
+    groups = []
+    leftover = []
+    used_names = set()
+    position = 0
+    for start, period, repeats in repeats_found:
+        leftover.extend(lines[position:start])
+        block = lines[start:start + period]
+        groups.append(f'<group name="{_group_name(block, used_names)}">')
+        groups.extend(block)
+        groups.append('</group>')
+        position = start + period * repeats
+    leftover.extend(lines[position:])
+
+    # ttp ignores top level lines once a template has groups; the "_" group
+    # keeps them and merges their matches into the top level of the results
+    if leftover:
+        return ['<group name="_">'] + leftover + ['</group>'] + groups
+    return groups
@@ -0,0 +1,54 @@
+# literal_matcher.py
+# Multi-literal matching. The literals are folded into a trie and the trie is
+# emitted as a single regular expression, so `re` walks shared prefixes once
+# instead of trying every alternative in turn. Where a literal is a prefix of
+# another, the longer one wins.
+import re
+
+
+def _build_trie(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return trie
+
+
+def _trie_to_pattern(node):
+    terminal = '' in node
+    branches = []
+    single_chars = []
+    for char in sorted(key for key in node if key):
+        tail = _trie_to_pattern(node[char])
+        if tail:
+            branches.append(re.escape(char) + tail)
+        else:
+            single_chars.append(re.escape(char))
+    if single_chars:
+        branches.append(single_chars[0] if len(single_chars) == 1 else '[' + ''.join(single_chars) + ']')
+    if not branches:
+        return ''
+
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    pattern = '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if terminal else pattern
+
+
+def trie_pattern(words):
+    # Regex source matching any of words, or None when there are no words
+    words = {word for word in words if word}
+    if not words:
+        return None
+    return _trie_to_pattern(_build_trie(words))
+
+
+def compile_literals(words, word_boundaries=False, flags=0):
+    pattern = trie_pattern(words)
+    if pattern is None:
+        return None
+    if word_boundaries:
+        pattern = r'\b' + pattern + r'\b'
+    return re.compile(pattern, flags)
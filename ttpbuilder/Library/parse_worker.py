@@ -0,0 +1,56 @@
+# parse_worker.py
+# Child side of the background template test runner. It runs in its own
+# process so a runaway parse can be killed without taking the GUI down.
+# Nothing in here may import PyQt6.
+from ttpbuilder.Library.analyzer import analyze
+from ttpbuilder.Library.core import parse_text, parser_cache
+from ttpbuilder.Library.prefilter import parse_prefiltered
+from ttpbuilder.Library.result_cache import ResultCache
+from ttpbuilder.Library.timing import StageTimer, profiled
+
+
+def serve(requests, responses):
+    result_cache = None
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        job_id, template, data, options = job
+        if options.get('analyze'):
+            responses.put(('progress', job_id, f"Timing template lines over {data.count(chr(10)) + 1} lines"))
+            try:
+                report = analyze(template, data)
+            except Exception as e:
+                responses.put(('failed', job_id, f"template analysis failed: {e}"))
+            else:
+                responses.put(('finished', job_id, report))
+            continue
+
+        if options.get('use_result_cache') and result_cache is None:
+            result_cache = ResultCache()
+        job_result_cache = result_cache if options.get('use_result_cache') else None
+
+        responses.put(('progress', job_id, f"Parsing {data.count(chr(10)) + 1} lines"))
+        timer = StageTimer()
+        try:
+            # A profile covers the whole parse, including compiling the template
+            with profiled(options.get('profile')):
+                if options.get('prefilter'):
+                    results, prefilter = parse_prefiltered(template, data, cache=parser_cache,
+                                                           result_cache=job_result_cache, timer=timer,
+                                                           verify=options.get('verify'))
+                else:
+                    prefilter = None
+                    results = parse_text(template, data, cache=parser_cache, result_cache=job_result_cache,
+                                         timer=timer)
+        except Exception as e:
+            responses.put(('failed', job_id, f"ttp parser failed: {e}"))
+        else:
+            stats = {
+                'parser_cache': parser_cache.stats(),
+                'result_cache': job_result_cache.stats() if job_result_cache else None,
+                'timings': timer.stages,
+                'profile': options.get('profile'),
+                'prefilter': prefilter,
+            }
+            responses.put(('finished', job_id, (results, stats)))
@@ -0,0 +1,120 @@
+# prefilter.py
+# Literal prefilter. Every template match line has literal words that any
+# input line it matches must contain; the longest one per template line goes
+# into a single multi-literal regex, and one pass over the input keeps only
+# the lines holding at least one of them. ttp matches line by line, so the
+# dropped lines could never have produced a match. No Qt imports.
+import re
+from collections import OrderedDict
+
+from ttpbuilder.Library.analyzer import match_lines
+from ttpbuilder.Library.core import first_difference, parse_text, template_hash
+from ttpbuilder.Library.literal_matcher import compile_literals
+from ttpbuilder.Library.template_lines import split_line, variable_filters
+from ttpbuilder.Library.timing import NULL_TIMER
+
+# Indicators whose lines match without their literal text being in the input
+ANY_LINE_INDICATORS = ('_line_', '_headers_')
+# Unless a line is _exact_, ttp matches every digit run of its literal text as \d+
+DIGITS = re.compile(r'\d+')
+CACHE_SIZE = 32
+
+
+def required_literal(line):
+    # Longest literal word a matching input line must contain. None when the
+    # line can match without any, '' when it is not a match line at all.
+    words = []
+    variables = []
+    for is_variable, text in split_line(line):
+        if is_variable:
+            variables.append(variable_filters(text))
+        else:
+            words.extend(text.split())
+    if '_exact_' not in line:
+        # Only the text around the digits is literal, GigabitEthernet0/1 also matches 1/0/3
+        words = [fragment for word in words for fragment in DIGITS.split(word) if fragment]
+    if any(indicator in filters for filters in variables for indicator in ANY_LINE_INDICATORS):
+        return None
+    if not words:
+        # A line of set() variables only assigns to its group, it matches nothing
+        if variables and all(any(f.startswith('set(') for f in filters) for filters in variables):
+            return ''
+        return None
+    return max(words, key=len)
+
+
+def required_literals(template):
+    # Literals for the whole template, or None when some line needs none
+    literals = set()
+    for _, line in match_lines(template):
+        literal = required_literal(line)
+        if literal is None:
+            return None
+        if literal:
+            literals.add(literal)
+    return literals or None
+
+
+class Prefilter:
+    def __init__(self, template):
+        literals = required_literals(template)
+        self.literals = sorted(literals) if literals else []
+        self.matcher = compile_literals(literals) if literals else None
+
+    @property
+    def active(self):
+        return self.matcher is not None
+
+    def apply(self, text):
+        # (filtered text, lines kept, lines in). Each search jumps to the next
+        # line holding a literal, so the text is scanned once.
+        total = text.count('\n') + 1
+        if self.matcher is None:
+            return text, total, total
+        kept = []
+        search = self.matcher.search
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                break
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            line_end = text.find('\n', match.end())
+            if line_end == -1:
+                line_end = len(text)
+            kept.append(text[line_start:line_end])
+            position = line_end + 1
+        return '\n'.join(kept), len(kept), total
+
+
+_prefilters = OrderedDict()
+
+
+def get_prefilter(template):
+    key = template_hash(template)
+    prefilter = _prefilters.get(key)
+    if prefilter is None:
+        prefilter = _prefilters[key] = Prefilter(template)
+        while len(_prefilters) > CACHE_SIZE:
+            _prefilters.popitem(last=False)
+    else:
+        _prefilters.move_to_end(key)
+    return prefilter
+
+
+def parse_prefiltered(template, data, cache=None, result_cache=None, timer=NULL_TIMER, verify=False):
+    # parse_text over the prefiltered data. With verify the unfiltered data is
+    # parsed too and any difference reported; the unfiltered results win then.
+    # Returns (results, info).
+    with timer.stage('prefilter'):
+        prefilter = get_prefilter(template)
+        filtered, kept, total = prefilter.apply(data)
+    results = parse_text(template, filtered, cache=cache, result_cache=result_cache, timer=timer)
+    info = {'active': prefilter.active, 'lines': total, 'kept': kept, 'verified': verify, 'mismatch': None}
+    if verify:
+        with timer.stage('verify parse'):
+            unfiltered = parse_text(template, data, cache=cache)
+        info['mismatch'] = first_difference(results, unfiltered)
+        if info['mismatch']:
+            results = unfiltered
+    return results, info
@@ -0,0 +1,120 @@
+# result_cache.py
+# Content-addressed on-disk cache of parse results, keyed on template hash,
+# capture hash and ttp version. Entries are gzipped JSON files; the file mtime
+# is bumped on every hit and the oldest entries are evicted past the size cap.
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from ttpbuilder.Library.core import template_hash
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ttpbuilder', 'results')
+
+
+def ttp_version():
+    try:
+        from importlib.metadata import version
+        return version('ttp')
+    except Exception:
+        return 'unknown'
+
+
+class ResultCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._version = ttp_version()
+        # Bytes on disk, computed on the first write and then tracked incrementally
+        self._size = None
+
+    def key(self, template, data):
+        digest = hashlib.sha256()
+        digest.update(template_hash(template).encode('ascii'))
+        digest.update(hashlib.sha256(data.encode('utf-8', 'surrogatepass')).digest())
+        digest.update(self._version.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json.gz')
+
+    def get(self, key):
+        # Returns (found, results)
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                results = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, results
+
+    def put(self, key, results):
+        try:
+            payload = gzip.compress(json.dumps(results).encode('utf-8'))
+        except (TypeError, ValueError):
+            # Results ttp could not express as JSON are simply not cached
+            return False
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+        os.replace(temp_path, path)
+
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += len(payload)
+        if self._size > self.max_bytes:
+            self._evict()
+        return True
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json.gz'):
+                    yield entry
+
+    def _scan_size(self):
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _evict(self):
+        # Least recently used first, down to 90% of the cap
+        entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in self._entries()))
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9
+        for mtime, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def clear(self):
+        for entry in list(self._entries()):
+            os.remove(entry.path)
+        self._size = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
@@ -0,0 +1,143 @@
+# result_model.py
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+# Children are materialized this many at a time as the view asks for them
+FETCH_BATCH = 500
+MAX_DISPLAY_LENGTH = 200
+
+
+class ResultNode:
+    __slots__ = ('parent', 'row', 'key', 'value', 'children', 'keys')
+
+    def __init__(self, parent, row, key, value):
+        self.parent = parent
+        self.row = row
+        self.key = key
+        self.value = value
+        self.children = None
+        self.keys = None
+
+    def is_container(self):
+        return isinstance(self.value, (dict, list, tuple))
+
+    def child_count(self):
+        return len(self.value) if self.is_container() else 0
+
+
+def describe(value):
+    if isinstance(value, dict):
+        return f"{{{len(value)} keys}}"
+    if isinstance(value, (list, tuple)):
+        return f"[{len(value)} items]"
+    text = str(value)
+    return text if len(text) <= MAX_DISPLAY_LENGTH else text[:MAX_DISPLAY_LENGTH] + '...'
+
+
+def filter_results(value, text):
+    # Copy of value pruned to the paths whose key or scalar value contains text
+    # (case-insensitive), or None when nothing matches. Only matches are copied.
+    needle = text.lower()
+
+    def prune(item):
+        if isinstance(item, dict):
+            kept = {}
+            for key, child in item.items():
+                if needle in str(key).lower():
+                    kept[key] = child
+                else:
+                    pruned = prune(child)
+                    if pruned is not None:
+                        kept[key] = pruned
+            return kept or None
+        if isinstance(item, (list, tuple)):
+            kept = [pruned for pruned in map(prune, item) if pruned is not None]
+            return kept or None
+        return item if needle in str(item).lower() else None
+
+    return prune(value)
+
+
+class ResultTreeModel(QAbstractItemModel):
+    # Tree over ttp's native result structure. Nodes are created only when the
+    # view expands their parent, and large containers are filled in batches.
+    HEADERS = ('Key', 'Value')
+
+    def __init__(self, results, parent=None):
+        super().__init__(parent)
+        self._root = ResultNode(None, 0, None, results)
+
+    def set_results(self, results):
+        self.beginResetModel()
+        self._root = ResultNode(None, 0, None, results)
+        self.endResetModel()
+
+    def results(self):
+        return self._root.value
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self._node(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self._node(parent).child_count() > 0
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        fetched = len(node.children) if node.children is not None else 0
+        return fetched < node.child_count()
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node.children is None:
+            node.children = []
+        first = len(node.children)
+        last = min(first + FETCH_BATCH, node.child_count())
+        if last <= first:
+            return
+
+        if isinstance(node.value, dict):
+            # dict views cannot be sliced, so the key order is captured once
+            if node.keys is None:
+                node.keys = list(node.value)
+            items = [(key, node.value[key]) for key in node.keys[first:last]]
+        else:
+            items = [(f"[{row}]", node.value[row]) for row in range(first, last)]
+
+        self.beginInsertRows(parent, first, last - 1)
+        node.children.extend(ResultNode(node, first + offset, key, value) for offset, (key, value) in enumerate(items))
+        self.endInsertRows()
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        node = index.internalPointer()
+        if index.column() == 0:
+            return str(node.key)
+        return describe(node.value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
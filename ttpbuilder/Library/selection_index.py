@@ -0,0 +1,96 @@
+# selection_index.py
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+
+class SelectionIndex:
+    # Sorted interval index over the named selections, used for hover and click
+    # hit testing. Intervals are inclusive on both ends (start <= pos <= end).
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+        self._ids = []
+        self._spans = {}
+        # Running maximum of self._ends, rebuilt lazily after a mutation
+        self._max_ends = []
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, unique_id):
+        return unique_id in self._spans
+
+    def add(self, unique_id, start, end):
+        if unique_id in self._spans:
+            self.remove(unique_id)
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._ids.insert(i, unique_id)
+        self._spans[unique_id] = (start, end)
+        if i == len(self._max_ends) and not self._dirty:
+            # Appending in offset order (bulk loads) keeps the running maximum valid
+            self._max_ends.append(max(end, self._max_ends[-1]) if self._max_ends else end)
+        else:
+            self._dirty = True
+
+    def remove(self, unique_id):
+        span = self._spans.pop(unique_id, None)
+        if span is None:
+            return False
+        i = bisect_left(self._starts, span[0])
+        while self._ids[i] != unique_id:
+            i += 1
+        del self._starts[i]
+        del self._ends[i]
+        del self._ids[i]
+        self._dirty = True
+        return True
+
+    def remove_many(self, unique_ids):
+        # One pass over the index instead of a list deletion per id
+        removed = {unique_id for unique_id in unique_ids if self._spans.pop(unique_id, None) is not None}
+        if not removed:
+            return 0
+        kept = [i for i, unique_id in enumerate(self._ids) if unique_id not in removed]
+        self._starts = [self._starts[i] for i in kept]
+        self._ends = [self._ends[i] for i in kept]
+        self._ids = [self._ids[i] for i in kept]
+        self._dirty = True
+        return len(removed)
+
+    def clear(self):
+        self._starts.clear()
+        self._ends.clear()
+        self._ids.clear()
+        self._spans.clear()
+        self._max_ends = []
+        self._dirty = False
+
+    def _refresh(self):
+        if self._dirty:
+            self._max_ends = list(accumulate(self._ends, max))
+            self._dirty = False
+
+    def find(self, position):
+        # Return the id of a selection containing position, or None
+        self._refresh()
+        i = bisect_right(self._starts, position) - 1
+        while i >= 0 and self._max_ends[i] >= position:
+            if self._ends[i] >= position:
+                return self._ids[i]
+            i -= 1
+        return None
+
+    def overlapping(self, low, high):
+        # Ids of all selections intersecting [low, high], ordered by start
+        self._refresh()
+        found = []
+        i = bisect_right(self._starts, high) - 1
+        while i >= 0 and self._max_ends[i] >= low:
+            if self._ends[i] >= low:
+                found.append(self._ids[i])
+            i -= 1
+        found.reverse()
+        return found
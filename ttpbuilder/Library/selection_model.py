@@ -0,0 +1,176 @@
+# selection_model.py
+import sys
+from itertools import count
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+KEY_ROLE = Qt.ItemDataRole.UserRole
+SORT_ORDERS = ('Added', 'Line', 'Name')
+# Removals of more rows than this reset the model instead
+RESET_THRESHOLD = 1000
+
+
+class Selection:
+    # One named selection. The line is a 1-based line number into the capture,
+    # the selected and line text are read from the capture when needed.
+    __slots__ = ('key', 'start', 'end', 'line', 'ttp_text')
+
+    def __init__(self, key, start, end, line, ttp_text):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.line = line
+        self.ttp_text = ttp_text
+
+    @property
+    def name(self):
+        return self.ttp_text.strip("{}").split("|")[0].strip()
+
+    def label(self):
+        return f"{self.name} {self.start}:{self.end} Line No.: {self.line}"
+
+
+_SORT_KEYS = {
+    'Added': lambda selection: selection.key,
+    'Line': lambda selection: (selection.start, selection.key),
+    'Name': lambda selection: (selection.name.lower(), selection.start, selection.key),
+}
+
+
+class SelectionModel(QAbstractListModel):
+    # Variable list over Selection records. Sorting and filtering happen here
+    # on plain lists, a proxy model would call back into Python per comparison.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._keys = count(1)
+        self._selections = {}
+        # Visible rows: filtered and sorted
+        self._rows = []
+        self._filter = ''
+        self._sort_order = 'Added'
+
+    def __len__(self):
+        return len(self._selections)
+
+    def __iter__(self):
+        return iter(self._selections.values())
+
+    def get(self, key):
+        return self._selections.get(key)
+
+    def selection_at(self, row):
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        selection = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return selection.label()
+        if role == KEY_ROLE:
+            return selection.key
+        return None
+
+    def _visible(self, selection):
+        return not self._filter or self._filter in selection.label().lower()
+
+    def add(self, rows):
+        # Bulk insert of (start, end, line, ttp_text); returns the new records
+        added = []
+        for start, end, line, ttp_text in rows:
+            selection = Selection(next(self._keys), start, end, line, sys.intern(ttp_text))
+            self._selections[selection.key] = selection
+            added.append(selection)
+
+        visible = [selection for selection in added if self._visible(selection)]
+        if not visible:
+            return added
+        if self._sort_order == 'Added':
+            # New keys sort last, so visible rows only grow at the end
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(visible) - 1)
+            self._rows.extend(visible)
+            self.endInsertRows()
+        else:
+            self._sort_rows(visible)
+        return added
+
+    def remove(self, keys):
+        # Bulk removal; rows go in contiguous runs, last run first. Scattered
+        # rows are cheaper to drop with one reset than run by run.
+        keys = {key for key in keys if key in self._selections}
+        removed = [self._selections.pop(key) for key in keys]
+        rows = [row for row, selection in enumerate(self._rows) if selection.key in keys]
+        if len(rows) > RESET_THRESHOLD:
+            self.beginResetModel()
+            self._rows = [selection for selection in self._rows if selection.key not in keys]
+            self.endResetModel()
+            return removed
+        while rows:
+            last = rows.pop()
+            first = last
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        return removed
+
+    def set_ttp_text(self, key, ttp_text):
+        # The name is part of the label the filter matches and the Name order,
+        # a renamed row may leave or join the visible rows or move
+        selection = self._selections[key]
+        selection.ttp_text = sys.intern(ttp_text)
+        shown = selection in self._rows
+        visible = self._visible(selection)
+        if shown and not visible:
+            row = self._rows.index(selection)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self.endRemoveRows()
+        elif visible and not shown:
+            sort_key = _SORT_KEYS[self._sort_order]
+            position = sort_key(selection)
+            row = next((row for row, other in enumerate(self._rows) if sort_key(other) > position), len(self._rows))
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.insert(row, selection)
+            self.endInsertRows()
+        elif shown and self._sort_order == 'Name':
+            self._sort_rows()
+        elif shown:
+            index = self.index(self._rows.index(selection))
+            self.dataChanged.emit(index, index)
+
+    def clear(self):
+        self.beginResetModel()
+        self._selections.clear()
+        self._rows = []
+        self.endResetModel()
+
+    def set_filter(self, text):
+        self._filter = text.strip().lower()
+        self._refresh_rows()
+
+    def set_sort_order(self, order):
+        self._sort_order = order
+        self._refresh_rows()
+
+    def _sort_rows(self, added=()):
+        # Re-sort as a layout change; persistent indexes, such as the view's
+        # selected rows, follow their selections to the new rows
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        held = [self._rows[index.row()] for index in persistent]
+        self._rows.extend(added)
+        self._rows.sort(key=_SORT_KEYS[self._sort_order])
+        rows = {selection.key: row for row, selection in enumerate(self._rows)}
+        self.changePersistentIndexList(persistent, [self.index(rows[selection.key]) for selection in held])
+        self.layoutChanged.emit()
+
+    def _refresh_rows(self):
+        self.beginResetModel()
+        self._rows = sorted((selection for selection in self._selections.values() if self._visible(selection)),
+                            key=_SORT_KEYS[self._sort_order])
+        self.endResetModel()
@@ -0,0 +1,68 @@
+# selection_overlay.py
+from PyQt6.QtCore import QEvent, QObject, QPoint, QTimer
+from PyQt6.QtGui import QColor, QTextCursor, QTextFormat
+from PyQt6.QtWidgets import QTextEdit
+
+from ttpbuilder.Library.util import doc_to_offset, offset_to_doc
+
+# Selection background per theme
+HIGHLIGHT_COLORS = {'dark': "green", 'light': "yellow"}
+
+
+class SelectionOverlay(QObject):
+    # Paints named selections as ExtraSelections over the editor instead of
+    # writing char formats into the document. Only selections intersecting the
+    # visible viewport are built, and any number of schedule() calls made in
+    # one event loop pass collapse into a single rebuild.
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.editor = parent.text_edit
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.rebuild)
+
+        self.editor.verticalScrollBar().valueChanged.connect(self.schedule)
+        self.editor.blockCountChanged.connect(self.schedule)
+        self.editor.viewport().installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Resize:
+            self.schedule()
+        return False
+
+    def schedule(self):
+        self._timer.start()
+
+    def rebuild(self):
+        parent = self.parent
+        editor = self.editor
+        if parent.capture is None or editor.document().isEmpty():
+            editor.setExtraSelections([])
+            return
+
+        # Capture offsets covered by the visible blocks
+        viewport = editor.viewport()
+        first_block = editor.firstVisibleBlock()
+        last_block = editor.cursorForPosition(QPoint(viewport.width(), viewport.height())).block()
+        low = doc_to_offset(parent, first_block.position())
+        high = doc_to_offset(parent, last_block.position() + last_block.length() - 1)
+
+        color = QColor(HIGHLIGHT_COLORS.get(parent.current_theme, "yellow"))
+        selections = []
+        for key in parent.selection_index.overlapping(low, high):
+            selection = parent.selections.get(key)
+            start = offset_to_doc(parent, selection.start)
+            end = offset_to_doc(parent, selection.end)
+            if start is None or end is None:
+                continue
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(editor.document())
+            selection.cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
+            selection.cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            selection.format.setBackground(color)
+            selection.format.setProperty(QTextFormat.Property.FullWidthSelection, False)
+            selections.append(selection)
+        editor.setExtraSelections(selections)
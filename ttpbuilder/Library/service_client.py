@@ -0,0 +1,66 @@
+# service_client.py
+# Client side of ttpbuilder-serve. A service address is either an HTTP URL or
+# host:port on localhost, or unix:/path/to/socket. No Qt imports.
+import http.client
+import json
+import socket
+from urllib.parse import urlsplit
+
+DEFAULT_PORT = 8765
+UNIX_PREFIX = 'unix:'
+
+
+class ServiceError(Exception):
+    pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def connect(address, timeout=None):
+    if address.startswith(UNIX_PREFIX):
+        return UnixHTTPConnection(address[len(UNIX_PREFIX):], timeout)
+    parts = urlsplit(address if '//' in address else '//' + address)
+    return http.client.HTTPConnection(parts.hostname or '127.0.0.1', parts.port or DEFAULT_PORT, timeout=timeout)
+
+
+def request(address, method, path, body=None, timeout=None):
+    # Decoded JSON reply; failures the service reports raise ServiceError
+    connection = connect(address, timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+    except OSError as e:
+        raise ServiceError(f"request to the parse service at {address} failed: {e}") from e
+    finally:
+        connection.close()
+    try:
+        reply = json.loads(payload)
+    except ValueError:
+        raise ServiceError(f"parse service answered {response.status} {response.reason}") from None
+    if response.status != 200:
+        raise ServiceError(reply.get('error') or f"parse service answered {response.status} {response.reason}")
+    return reply
+
+
+def parse(address, template, text, timeout=None, prefilter=False, verify=False):
+    # Parse text with an ad hoc template. The reply holds results, timings,
+    # the worker's parser cache stats and the prefilter info.
+    body = json.dumps({'template': template, 'text': text, 'prefilter': prefilter, 'verify': verify})
+    return request(address, 'POST', '/parse', body.encode('utf-8'), timeout)
+
+
+def parse_named(address, name, text, timeout=None, prefilter=False, verify=False):
+    query = '&'.join(option for option, on in (('prefilter=1', prefilter), ('verify=1', verify)) if on)
+    path = f"/parse/{name}" + (f"?{query}" if query else '')
+    return request(address, 'POST', path, text.encode('utf-8'), timeout)
@@ -0,0 +1,213 @@
+# session.py
+# Session files: the capture text and every named selection, so a session can
+# be closed and reopened. No Qt imports.
+#
+# A session file is a magic header followed by records, each a one byte kind
+# and a length:
+#   M  JSON metadata (capture name, encoding, byte order)
+#   T  capture text, zlib compressed in a stream
+#   S  selections as zlib compressed columns, sorted by start
+#   D  JSON list of selection add/remove/update operations, appended by autosave
+# A full save rewrites the file as M, T, S; autosave only appends D records.
+# A truncated trailing record, from a crash mid-append, is ignored on load.
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from ttpbuilder.Library.capture import Capture
+
+MAGIC = b'TTPBSES1'
+SESSION_SUFFIX = '.ttpsession'
+_RECORD = struct.Struct('<cQ')
+_CHUNK = 1 << 20
+
+
+class SessionJournal:
+    # Selection changes since the last save, in the order they happened. Like
+    # the file, operations address selections by (start, end).
+    def __init__(self):
+        self.operations = []
+
+    def __bool__(self):
+        return bool(self.operations)
+
+    def clear(self):
+        self.operations = []
+
+    def add(self, start, end, line, ttp_text):
+        self.operations.append(['add', start, end, line, ttp_text])
+
+    def remove(self, start, end):
+        self.operations.append(['remove', start, end])
+
+    def update(self, start, end, ttp_text):
+        self.operations.append(['update', start, end, ttp_text])
+
+
+def _write_record(file, kind, payload):
+    file.write(_RECORD.pack(kind, len(payload)))
+    file.write(payload)
+
+
+def _write_text(file, capture):
+    # Stream the capture through the compressor, the length is patched in afterwards
+    header_at = file.tell()
+    file.write(_RECORD.pack(b'T', 0))
+    compressor = zlib.compressobj(6)
+    written = 0
+    for offset in range(0, capture.length, _CHUNK):
+        chunk = capture.raw_slice(offset, offset + _CHUNK)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        written += file.write(compressor.compress(chunk))
+    written += file.write(compressor.flush())
+    end = file.tell()
+    file.seek(header_at)
+    file.write(_RECORD.pack(b'T', written))
+    file.seek(end)
+
+
+def encode_selections(rows):
+    # rows are (start, end, line, ttp_text). Starts and lines are stored as
+    # deltas and ttp_text as an index into a string table, which all compress well.
+    rows = sorted(rows)
+    strings = {}
+    columns = [array('q') for _ in range(4)]
+    starts, lengths, lines, texts = columns
+    previous_start = previous_line = 0
+    for start, end, line, ttp_text in rows:
+        starts.append(start - previous_start)
+        lengths.append(end - start)
+        lines.append(line - previous_line)
+        texts.append(strings.setdefault(ttp_text, len(strings)))
+        previous_start, previous_line = start, line
+    header = json.dumps({'count': len(rows), 'strings': list(strings)}).encode('utf-8')
+    return zlib.compress(struct.pack('<I', len(header)) + header + b''.join(column.tobytes() for column in columns))
+
+
+def decode_selections(payload, byteorder=sys.byteorder):
+    data = zlib.decompress(payload)
+    header_length, = struct.unpack_from('<I', data)
+    header = json.loads(data[4:4 + header_length])
+    count = header['count']
+    strings = header['strings']
+    columns = []
+    position = 4 + header_length
+    for _ in range(4):
+        column = array('q')
+        column.frombytes(data[position:position + count * column.itemsize])
+        if byteorder != sys.byteorder:
+            column.byteswap()
+        columns.append(column)
+        position += count * column.itemsize
+
+    rows = []
+    start = line = 0
+    for start_delta, length, line_delta, text_index in zip(*columns):
+        start += start_delta
+        line += line_delta
+        rows.append((start, start + length, line, strings[text_index]))
+    return rows
+
+
+def save_session(path, capture, rows):
+    # Full save, written next to the target and renamed over it
+    meta = {
+        'name': os.path.basename(capture.path) if capture.path else None,
+        'encoding': 'latin-1' if capture.is_mapped else 'utf-8',
+        'byteorder': sys.byteorder,
+    }
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(MAGIC)
+        _write_record(file, b'M', json.dumps(meta).encode('utf-8'))
+        _write_text(file, capture)
+        _write_record(file, b'S', encode_selections(rows))
+    os.replace(temporary_path, path)
+
+
+def append_delta(path, journal):
+    if not journal:
+        return False
+    with open(path, 'ab') as file:
+        _write_record(file, b'D', json.dumps(journal.operations).encode('utf-8'))
+    journal.clear()
+    return True
+
+
+def _read_records(file):
+    # Yields (kind, length) with the file positioned at the payload
+    size = os.fstat(file.fileno()).st_size
+    while True:
+        header = file.read(_RECORD.size)
+        if len(header) < _RECORD.size:
+            return
+        kind, length = _RECORD.unpack(header)
+        payload_at = file.tell()
+        if payload_at + length > size:
+            return
+        yield kind, length
+        file.seek(payload_at + length)
+
+
+def _read_text(file, length):
+    decompressor = zlib.decompressobj()
+    text = bytearray()
+    remaining = length
+    while remaining:
+        chunk = file.read(min(_CHUNK, remaining))
+        remaining -= len(chunk)
+        text += decompressor.decompress(chunk)
+    text += decompressor.flush()
+    return bytes(text)
+
+
+def load_session(path):
+    # Returns (capture, rows); rows are (start, end, line, ttp_text) sorted by start
+    meta = {}
+    text = b''
+    selections = {}
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a ttpbuilder session file")
+        for kind, length in _read_records(file):
+            if kind == b'T':
+                text = _read_text(file, length)
+                continue
+            payload = file.read(length)
+            if kind == b'M':
+                meta = json.loads(payload)
+            elif kind == b'S':
+                selections = {}
+                for start, end, line, ttp_text in decode_selections(payload, meta.get('byteorder', sys.byteorder)):
+                    selections.setdefault((start, end), []).append([line, ttp_text])
+            elif kind == b'D':
+                _apply_delta(selections, json.loads(payload))
+
+    name = meta.get('name') or os.path.basename(path)
+    if meta.get('encoding') == 'latin-1':
+        capture = Capture.from_buffer(text, name)
+    else:
+        capture = Capture.from_text(text.decode('utf-8'))
+        capture.path = name
+    rows = sorted((start, end, line, ttp_text)
+                  for (start, end), entries in selections.items() for line, ttp_text in entries)
+    return capture, rows
+
+
+def _apply_delta(selections, operations):
+    for operation, start, end, *values in operations:
+        if operation == 'add':
+            selections.setdefault((start, end), []).append(values)
+        elif operation == 'remove':
+            entries = selections.get((start, end))
+            if entries:
+                entries.pop()
+                if not entries:
+                    del selections[(start, end)]
+        elif operation == 'update':
+            for entry in selections.get((start, end), ()):
+                entry[1] = values[0]
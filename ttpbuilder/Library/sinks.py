@@ -0,0 +1,190 @@
+# sinks.py
+# Streaming result writers. Each capture's results are written as soon as they
+# are handed over and then dropped, so memory stays bounded by one capture
+# however large the corpus. Output is flushed every few seconds, so a reader
+# tailing the file sees progress, and gzip-compressed for a .gz path or on
+# request. No Qt imports.
+import abc
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+
+FORMATS = ('ndjson', 'records', 'csv')
+DEFAULT_FLUSH_SECONDS = 2.0
+EXTRA_COLUMN = 'extra'
+
+
+def _is_container(value):
+    return isinstance(value, dict) or (isinstance(value, list) and any(isinstance(item, (dict, list))
+                                                                       for item in value))
+
+
+def flatten(results):
+    # (group path, fields) per record of ttp's native results. A record is a
+    # dict of plain values; fields are named by their dotted path, and the
+    # plain values of enclosing groups are repeated on every nested record.
+    return _flatten(results, (), {})
+
+
+def _flatten(value, path, inherited):
+    if isinstance(value, list):
+        for item in value:
+            yield from _flatten(item, path, inherited)
+        return
+    if not isinstance(value, dict):
+        yield '.'.join(path), {**inherited, '.'.join(path) or 'value': value}
+        return
+
+    fields = dict(inherited)
+    children = []
+    for key, item in value.items():
+        if _is_container(item):
+            children.append((key, item))
+        else:
+            fields['.'.join((*path, key))] = item
+    emitted = False
+    for key, item in children:
+        for record in _flatten(item, (*path, key), fields):
+            emitted = True
+            yield record
+    # Enclosing values only stand on their own when no nested record carries them
+    if not emitted and len(fields) > len(inherited):
+        yield '.'.join(path), fields
+
+
+def open_output(path=None, compress=None, newline=None):
+    # Text stream for path, stdout for None or '-'. compress defaults to the .gz suffix.
+    to_stdout = path in (None, '-')
+    if compress is None:
+        compress = not to_stdout and path.endswith('.gz')
+    if to_stdout:
+        if not compress:
+            return sys.stdout, False
+        raw = gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb')
+        return io.TextIOWrapper(raw, encoding='utf-8', newline=newline), True
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline=newline), True
+    return open(path, 'w', encoding='utf-8', newline=newline), True
+
+
+class ResultSink(abc.ABC):
+    # Subclasses write one capture's results in _write
+    newline = None
+
+    def __init__(self, path=None, compress=None, flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.file, self._owned = open_output(path, compress, self.newline)
+        self.flush_seconds = flush_seconds
+        self.captures = 0
+        self.records = 0
+        self._flushed = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, capture, results, error=None):
+        self._write(capture, results, error)
+        self.captures += 1
+        now = time.monotonic()
+        if now - self._flushed >= self.flush_seconds:
+            # On a gzip stream this is a sync flush, the output so far decompresses on its own
+            self.file.flush()
+            self._flushed = now
+
+    @abc.abstractmethod
+    def _write(self, capture, results, error):
+        pass
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class NdjsonSink(ResultSink):
+    # One JSON document per capture with its native results, the batch format
+    def _write(self, capture, results, error):
+        record = {'capture': capture, 'results': results}
+        if error:
+            record['error'] = error
+        self.file.write(json.dumps(record) + '\n')
+        self.records += 1
+
+
+class RecordSink(ResultSink):
+    # One JSON document per flattened record
+    def _write(self, capture, results, error):
+        if error:
+            self.file.write(json.dumps({'capture': capture, 'error': error}) + '\n')
+        for group, fields in flatten(results or []):
+            self.file.write(json.dumps({'capture': capture, 'group': group, **fields}) + '\n')
+            self.records += 1
+
+
+class CsvSink(ResultSink):
+    # One row per flattened record. The columns are fixed by the first capture
+    # with records (or given up front); fields first seen later go into the
+    # extra column as JSON. Rows written before the columns are known (failed
+    # captures) wait for them.
+    newline = ''
+
+    def __init__(self, path=None, compress=None, flush_seconds=DEFAULT_FLUSH_SECONDS, columns=None):
+        super().__init__(path, compress, flush_seconds)
+        self._writer = csv.writer(self.file)
+        self.columns = None
+        self._pending = []
+        if columns is not None:
+            self._set_columns(columns)
+
+    def _set_columns(self, columns):
+        self.columns = list(columns)
+        self._writer.writerow(['capture', 'group', *self.columns, 'error', EXTRA_COLUMN])
+        for row in self._pending:
+            self._write_row(*row)
+        self._pending = []
+
+    def _write(self, capture, results, error):
+        records = flatten(results or [])
+        if self.columns is None:
+            records = list(records)
+            if not records:
+                if error:
+                    self._pending.append((capture, '', {}, error))
+                return
+            self._set_columns(dict.fromkeys(name for _, fields in records for name in fields))
+        if error:
+            self._write_row(capture, '', {}, error)
+        for group, fields in records:
+            self._write_row(capture, group, fields)
+            self.records += 1
+
+    def _write_row(self, capture, group, fields, error=None):
+        row = [capture, group]
+        row.extend(_cell(fields.pop(name, '')) for name in self.columns)
+        row.append(error or '')
+        row.append(json.dumps(fields) if fields else '')
+        self._writer.writerow(row)
+
+    def close(self):
+        if self.columns is None:
+            self._set_columns([])
+        super().close()
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    return value if isinstance(value, (str, int, float)) else json.dumps(value)
+
+
+SINKS = {'ndjson': NdjsonSink, 'records': RecordSink, 'csv': CsvSink}
+
+
+def open_sink(sink_format, path=None, compress=None, flush_seconds=DEFAULT_FLUSH_SECONDS):
+    return SINKS[sink_format](path, compress=compress, flush_seconds=flush_seconds)
@@ -0,0 +1,176 @@
+# template_library.py
+# Local library of templates with a fingerprint index. Each template is reduced
+# to its anchor lines, the whole literal words of every match line, and an
+# inverted index maps each word to the templates using it. Ranking a capture
+# is one pass collecting which indexed words it contains, then scoring only
+# the templates those words lead to. No Qt imports.
+import json
+import os
+import re
+
+from ttpbuilder.Library.analyzer import match_lines
+from ttpbuilder.Library.template_lines import split_line
+
+TEMPLATE_SUFFIX = '.ttp'
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+# Lines of a capture looked at per batch when collecting its words
+LINES_PER_BATCH = 50000
+_INVALID_NAME_CHARS = re.compile(r'[^\w.-]+')
+
+
+def library_name(name):
+    # The file-safe name a template is stored under
+    return _INVALID_NAME_CHARS.sub('_', name).strip('._') or 'template'
+
+
+def default_library_dir():
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'ttpbuilder', 'templates')
+
+
+def anchor_words(line):
+    # Whole literal words of a template line. A word glued to a variable, like
+    # "Gi" in "Gi{{ port }}", is only part of a capture word and is left out.
+    words = []
+    parts = split_line(line)
+    for position, (is_variable, text) in enumerate(parts):
+        if is_variable:
+            continue
+        split = text.split()
+        if split and position > 0 and not text[0].isspace():
+            split = split[1:]
+        if split and position + 1 < len(parts) and not text[-1].isspace():
+            split = split[:-1]
+        words.extend(split)
+    return words
+
+
+def fingerprint(template):
+    # Distinct anchors, each a list of words, in template order
+    anchors = []
+    seen = set()
+    for _, line in match_lines(template):
+        words = anchor_words(line)
+        key = ' '.join(words)
+        if words and key not in seen:
+            seen.add(key)
+            anchors.append(words)
+    return anchors
+
+
+class Candidate:
+    __slots__ = ('name', 'score', 'anchors_hit', 'anchors_total')
+
+    def __init__(self, name, score, anchors_hit, anchors_total):
+        self.name = name
+        self.score = score
+        self.anchors_hit = anchors_hit
+        self.anchors_total = anchors_total
+
+
+class TemplateLibrary:
+    def __init__(self, directory=None):
+        self.directory = directory or default_library_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries = {}
+        self._postings = {}
+        self._load_index()
+        self.refresh()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + TEMPLATE_SUFFIX)
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'r', encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if index.get('version') == INDEX_VERSION:
+            self._entries = index['templates']
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'version': INDEX_VERSION, 'templates': self._entries}, file)
+        os.replace(path + '.tmp', path)
+
+    def refresh(self):
+        # Re-fingerprint templates added or changed on disk since the index was written
+        present = {}
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(TEMPLATE_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, file_name))
+                present[file_name[:-len(TEMPLATE_SUFFIX)]] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = False
+        for name in list(self._entries):
+            if name not in present:
+                del self._entries[name]
+                changed = True
+        for name, (mtime, size) in present.items():
+            entry = self._entries.get(name)
+            if entry is None or entry['mtime'] != mtime or entry['size'] != size:
+                self._entries[name] = {'mtime': mtime, 'size': size, 'anchors': fingerprint(self.template(name))}
+                changed = True
+        if changed:
+            self._save_index()
+
+        self._postings = {}
+        for name, entry in self._entries.items():
+            for words in entry['anchors']:
+                for word in words:
+                    self._postings.setdefault(word, set()).add(name)
+
+    def __contains__(self, name):
+        return os.path.exists(self._path(name))
+
+    def names(self):
+        return sorted(self._entries)
+
+    def anchor_count(self, name):
+        return len(self._entries[name]['anchors'])
+
+    def template(self, name):
+        with open(self._path(name), 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def add(self, name, template, replace=False):
+        # FileExistsError when the name is taken, unless replacing it
+        name = library_name(name)
+        with open(self._path(name), 'w' if replace else 'x', encoding='utf-8') as file:
+            file.write(template)
+        self.refresh()
+        return name
+
+    def remove(self, name):
+        os.remove(self._path(name))
+        self.refresh()
+
+    def capture_words(self, capture):
+        # Indexed words present in the capture, collected batch by batch so a
+        # large capture never becomes one big set of all its words
+        found = set()
+        vocabulary = self._postings.keys()
+        for first_line in range(0, capture.line_count, LINES_PER_BATCH):
+            text = capture.text(first_line, first_line + LINES_PER_BATCH)
+            found.update(vocabulary & set(text.split()))
+        return found
+
+    def rank(self, capture, limit=10):
+        # Candidates sorted by the share of their anchors found in the capture.
+        # Only templates sharing at least one word with the capture are scored.
+        found = self.capture_words(capture)
+        reached = set()
+        for word in found:
+            reached.update(self._postings[word])
+
+        candidates = []
+        for name in reached:
+            anchors = self._entries[name]['anchors']
+            hit = sum(1 for words in anchors if all(word in found for word in words))
+            if hit:
+                candidates.append(Candidate(name, hit / len(anchors), hit, len(anchors)))
+        candidates.sort(key=lambda candidate: (-candidate.score, -candidate.anchors_hit, candidate.name))
+        return candidates[:limit]
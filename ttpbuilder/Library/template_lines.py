@@ -0,0 +1,57 @@
+# template_lines.py
+# Helpers for looking inside TTP template lines: splitting them into literal
+# text and {{ variable }} spans, and reducing a line to its shape.
+import re
+
+VARIABLE_REGEX = re.compile(r'\{\{(.*?)\}\}')
+TAG_REGEX = re.compile(r'^\s*</?\s*([A-Za-z_][\w-]*)[^>]*>\s*$')
+
+
+def split_line(line):
+    # [(is_variable, text)], where text is the inside of the braces for variables
+    parts = []
+    position = 0
+    for match in VARIABLE_REGEX.finditer(line):
+        if match.start() > position:
+            parts.append((False, line[position:match.start()]))
+        parts.append((True, match.group(1)))
+        position = match.end()
+    if position < len(line):
+        parts.append((False, line[position:]))
+    return parts
+
+
+def variable_name(inner):
+    return inner.split('|')[0].strip()
+
+
+def variable_filters(inner):
+    return [part.strip() for part in inner.split('|')[1:]]
+
+
+def line_variables(line):
+    return [variable_name(text) for is_variable, text in split_line(line) if is_variable]
+
+
+def line_literals(line):
+    # Whitespace-separated literal words of a line, variables excluded
+    words = []
+    for is_variable, text in split_line(line):
+        if not is_variable:
+            words.extend(text.split())
+    return words
+
+
+def line_shape(line):
+    # Literal words kept, every variable collapsed to one placeholder, so two
+    # lines that differ only in variable names share a shape
+    shape = []
+    for is_variable, text in split_line(line):
+        shape.append('\x00' if is_variable else ' '.join(text.split()))
+    return '\x01'.join(shape)
+
+
+def tag_name(line):
+    # Name of an XML tag line such as <group name="x"> or </group>, else None
+    match = TAG_REGEX.match(line)
+    return match.group(1) if match else None
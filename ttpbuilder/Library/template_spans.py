@@ -0,0 +1,105 @@
+# template_spans.py
+# Template lines kept per capture line. Each named selection is a span at a
+# column of its line; a template line is its capture line with the spans
+# swapped for their ttp text, and is only rendered again when one of its own
+# spans is added, renamed or removed. No Qt imports.
+from bisect import bisect_left, insort
+
+from ttpbuilder.Library.grouping import collapse_repeats
+from ttpbuilder.Library.template_lines import line_shape
+
+
+class TemplateLine:
+    __slots__ = ('text', 'spans', 'rendered', 'shape')
+
+    def __init__(self, text):
+        self.text = text
+        # [start, end, ttp_text, key], sorted by column
+        self.spans = []
+        self.rendered = None
+        self.shape = None
+
+    def render(self):
+        pieces = []
+        position = 0
+        for start, end, ttp_text, _ in self.spans:
+            # Overlapping selections cannot both be replaced, the first one wins
+            if start < position:
+                continue
+            pieces.append(self.text[position:start])
+            pieces.append(ttp_text)
+            position = end
+        pieces.append(self.text[position:])
+        self.rendered = ''.join(pieces)
+        self.shape = line_shape(self.rendered)
+
+
+class TemplateSpans:
+    def __init__(self):
+        self._lines = {}
+        self._line_numbers = []
+        self._line_of = {}
+        # Bumped on every change, lets a preview skip work when nothing moved
+        self.version = 0
+
+    def __len__(self):
+        return len(self._line_of)
+
+    def clear(self):
+        self._lines.clear()
+        self._line_numbers.clear()
+        self._line_of.clear()
+        self.version += 1
+
+    def add(self, key, line, line_text, start, end, ttp_text):
+        # start and end are columns in line_text; a span never reaches past its line
+        entry = self._lines.get(line)
+        if entry is None:
+            entry = self._lines[line] = TemplateLine(line_text)
+            insort(self._line_numbers, line)
+        insort(entry.spans, [start, min(end, len(line_text)), ttp_text, key])
+        entry.rendered = None
+        self._line_of[key] = line
+        self.version += 1
+
+    def remove(self, key):
+        line = self._line_of.pop(key, None)
+        if line is None:
+            return
+        entry = self._lines[line]
+        entry.spans = [span for span in entry.spans if span[3] != key]
+        entry.rendered = None
+        if not entry.spans:
+            del self._lines[line]
+            del self._line_numbers[bisect_left(self._line_numbers, line)]
+        self.version += 1
+
+    def update(self, key, ttp_text):
+        line = self._line_of.get(key)
+        if line is None:
+            return
+        entry = self._lines[line]
+        for span in entry.spans:
+            if span[3] == key:
+                span[2] = ttp_text
+        entry.rendered = None
+        self.version += 1
+
+    def template_lines(self):
+        # (rendered lines, their shapes) in capture order
+        lines = []
+        shapes = []
+        for line in self._line_numbers:
+            entry = self._lines[line]
+            if entry.rendered is None:
+                entry.render()
+            lines.append(entry.rendered)
+            shapes.append(entry.shape)
+        return lines, shapes
+
+    def template(self, group_repeats=False):
+        lines, shapes = self.template_lines()
+        if group_repeats:
+            return '\n'.join(collapse_repeats(lines, shapes=shapes))
+        # Without groups a line repeated verbatim adds nothing to the template
+        return '\n'.join(dict.fromkeys(lines))
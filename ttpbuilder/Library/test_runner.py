@@ -0,0 +1,288 @@
+# test_runner.py
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from ttpbuilder.Library.chunked import parse_chunked
+from ttpbuilder.Library.coverage import measure_capture
+from ttpbuilder.Library.parse_worker import serve
+from ttpbuilder.Library.timing import StageTimer
+
+
+class TestJob(QObject):
+    progress = pyqtSignal(str)
+    # Corpus runs: the rows that came in since the last poll
+    partial = pyqtSignal(list)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class TemplateTestRunner(QObject):
+    # Runs test parses in a long-lived child process and reports back through
+    # TestJob signals. The GUI thread only polls the response queue.
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._requests = None
+        self._responses = None
+        self._job = None
+        self._job_id = 0
+        self._stage = ''
+        self._started = 0.0
+        self._timeout = None
+        # Chunked and service parses: the pool, the thread feeding it or
+        # waiting on the service, and its cancel flag
+        self._pool = None
+        self._workers = 0
+        self._thread = None
+        self._thread_uses_pool = False
+        self._cancelled = None
+        self._local_responses = queue.Queue()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.POLL_INTERVAL_MS)
+        self._timer.timeout.connect(self._poll)
+
+    def is_running(self):
+        return self._job is not None
+
+    def has_worker(self):
+        # False until the first start() and after a kill, when start() has to spawn a new process
+        return self._process is not None and self._process.is_alive()
+
+    def has_pool(self, workers=None):
+        return self._pool is not None and self._workers == (workers or os.cpu_count())
+
+    def start(self, template, data, timeout=None, **options):
+        if self._job is not None:
+            self.cancel()
+        self._ensure_process()
+
+        job = self._new_job(timeout)
+        self._requests.put((self._job_id, template, data, options))
+        self._timer.start()
+        return job
+
+    def start_chunked(self, template, capture, timeout=None, workers=None, verify=False, prefilter=False):
+        # The capture is cut at record boundaries and parsed across a pool. The
+        # test worker is a daemon process, which may not have children, so the
+        # pool belongs to the runner and a thread here feeds it and merges.
+        if self._job is not None:
+            self.cancel()
+        workers = workers or os.cpu_count()
+        if not self.has_pool(workers):
+            self._kill_pool()
+            self._pool = self._context.Pool(workers)
+            self._workers = workers
+
+        job = self._new_job(timeout)
+        self._start_thread(self._run_chunked, self._pool, template, capture, workers, verify, prefilter)
+        self._thread_uses_pool = True
+        return job
+
+    def start_corpus(self, template, columns, paths, workers=None, prefilter=False):
+        # Every capture is parsed whole on the pool; coverage rows arrive as
+        # the workers finish them, in no particular order
+        if self._job is not None:
+            self.cancel()
+        workers = workers or os.cpu_count()
+        if not self.has_pool(workers):
+            self._kill_pool()
+            self._pool = self._context.Pool(workers)
+            self._workers = workers
+
+        job = self._new_job(None)
+        self._start_thread(self._run_corpus, self._pool, template, columns, paths, prefilter)
+        self._thread_uses_pool = True
+        return job
+
+    def start_remote(self, address, template, data, timeout=None, prefilter=False, verify=False):
+        # Parse on a running ttpbuilder-serve instead of the local worker
+        if self._job is not None:
+            self.cancel()
+        job = self._new_job(timeout)
+        self._stage = 'Waiting for the parse service'
+        self._start_thread(self._run_remote, address, template, data, timeout, prefilter, verify)
+        return job
+
+    def cancel(self):
+        if self._job is None:
+            return
+        self._kill_job()
+        self._finish('failed', 'Test cancelled')
+
+    def shutdown(self):
+        self._timer.stop()
+        self._job = None
+        if self._process is not None and self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(1)
+        self._kill_process()
+        self._kill_pool()
+
+    def _new_job(self, timeout):
+        self._job_id += 1
+        self._job = TestJob(self)
+        self._thread = None
+        self._stage = 'Starting parser'
+        self._started = time.monotonic()
+        self._timeout = timeout
+        return self._job
+
+    def _start_thread(self, target, *args):
+        self._cancelled = threading.Event()
+        self._thread_uses_pool = False
+        self._thread = threading.Thread(target=target, daemon=True, args=(self._cancelled, self._job_id, *args))
+        self._thread.start()
+        self._timer.start()
+
+    def _run_chunked(self, cancelled, job_id, pool, template, capture, workers, verify, prefilter):
+        # Runs on the feeding thread. Responses go through a local queue, polled
+        # like the worker's, and results of a cancelled job are dropped by id.
+        responses = self._local_responses
+
+        def map_function(function, jobs):
+            results = pool.imap(function, jobs)
+            while True:
+                try:
+                    yield results.next(self.POLL_INTERVAL_MS / 1000)
+                except multiprocessing.TimeoutError:
+                    if cancelled.is_set():
+                        return
+                except StopIteration:
+                    return
+
+        def progress(done, total):
+            responses.put(('progress', job_id, f"Parsed {done} of {total} chunks"))
+
+        timer = StageTimer()
+        try:
+            results, info = parse_chunked(template, capture, map_function, workers=workers, verify=verify,
+                                          prefilter=prefilter, progress=progress, timer=timer)
+        except Exception as e:
+            responses.put(('failed', job_id, f"ttp parser failed: {e}"))
+            return
+        if not cancelled.is_set():
+            stats = {'parser_cache': None, 'result_cache': None, 'timings': timer.stages, 'profile': None,
+                     'prefilter': None, 'chunked': info}
+            responses.put(('finished', job_id, (results, stats)))
+
+    def _run_corpus(self, cancelled, job_id, pool, template, columns, paths, prefilter):
+        responses = self._local_responses
+        rows = pool.imap_unordered(measure_capture, ((template, columns, path, prefilter) for path in paths))
+        done = 0
+        while done < len(paths):
+            try:
+                row = rows.next(self.POLL_INTERVAL_MS / 1000)
+            except multiprocessing.TimeoutError:
+                if cancelled.is_set():
+                    return
+                continue
+            done += 1
+            responses.put(('partial', job_id, row))
+            responses.put(('progress', job_id, f"Tested {done} of {len(paths)} captures"))
+        if not cancelled.is_set():
+            responses.put(('finished', job_id, done))
+
+    def _run_remote(self, cancelled, job_id, address, template, data, timeout, prefilter, verify):
+        # Runs on its own thread; a cancelled request is left to finish and its answer dropped.
+        # http.client pulls in ssl and email, only load it once a service is used.
+        from ttpbuilder.Library.service_client import ServiceError, parse as parse_remote
+        try:
+            reply = parse_remote(address, template, data, timeout=timeout, prefilter=prefilter, verify=verify)
+        except ServiceError as e:
+            self._local_responses.put(('failed', job_id, str(e)))
+            return
+        if not cancelled.is_set():
+            stats = {'parser_cache': reply['parser_cache'], 'result_cache': None, 'timings': reply['timings'],
+                     'profile': None, 'prefilter': reply['prefilter'], 'service': address}
+            self._local_responses.put(('finished', job_id, (reply['results'], stats)))
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        # Fresh queues, the old ones may be left half-written by a killed child
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        self._process = self._context.Process(target=serve, args=(self._requests, self._responses), daemon=True)
+        self._process.start()
+
+    def _kill_job(self):
+        if self._thread is not None:
+            self._cancelled.set()
+            if self._thread_uses_pool:
+                self._kill_pool()
+        else:
+            self._kill_process()
+
+    def _kill_pool(self):
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool = None
+
+    def _kill_process(self):
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(1)
+        self._process = None
+
+    def _poll(self):
+        responses = self._responses if self._thread is None else self._local_responses
+        partial = []
+        while self._job is not None:
+            try:
+                kind, job_id, payload = responses.get_nowait()
+            except queue.Empty:
+                break
+            if job_id != self._job_id:
+                continue
+            if kind == 'progress':
+                self._stage = payload
+            elif kind == 'partial':
+                partial.append(payload)
+            else:
+                if partial:
+                    self._job.partial.emit(partial)
+                if self._job is not None:
+                    self._finish(kind, payload)
+                return
+        if partial:
+            self._job.partial.emit(partial)
+
+        if self._job is None:
+            return
+
+        elapsed = time.monotonic() - self._started
+        if self._timeout and elapsed > self._timeout:
+            self._kill_job()
+            self._finish('failed', f"ttp parser timed out after {self._timeout} seconds")
+        elif self._thread is not None:
+            if not self._thread.is_alive() and responses.empty():
+                self._finish('failed', 'ttp parser thread exited unexpectedly')
+            else:
+                self._job.progress.emit(f"{self._stage}... {elapsed:.1f}s")
+        elif not self._process.is_alive():
+            self._process = None
+            self._finish('failed', 'ttp parser process exited unexpectedly')
+        else:
+            self._job.progress.emit(f"{self._stage}... {elapsed:.1f}s")
+
+    def _finish(self, kind, payload):
+        job = self._job
+        self._job = None
+        self._timer.stop()
+        if kind == 'finished':
+            job.finished.emit(payload)
+        else:
+            job.failed.emit(payload)
+        job.deleteLater()
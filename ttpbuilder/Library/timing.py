@@ -0,0 +1,68 @@
+# timing.py
+# Lightweight per-stage wall clock timers. Used on both sides of the test
+# runner, so nothing in here may import PyQt6.
+import cProfile
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+
+class StageTimer:
+    def __init__(self):
+        # Stage name -> seconds, in the order stages first ran
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def update(self, stages):
+        for name, seconds in stages.items():
+            self.add(name, seconds)
+
+    def total(self):
+        return sum(self.stages.values())
+
+    def summary(self):
+        return ' | '.join(f"{name} {format_duration(seconds)}" for name, seconds in self.stages.items())
+
+
+class NullTimer:
+    # Stands in when nobody asked for timings
+    stages = {}
+
+    def stage(self, name):
+        return nullcontext()
+
+    def add(self, name, seconds):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def format_duration(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms" if seconds >= 0.01 else f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+@contextmanager
+def profiled(path):
+    # cProfile the block and write a pstats file to path; a no-op without a path
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -1,13 +1,35 @@
 # util.py
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from ttp import ttp
-from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
-from PyQt6.QtCore import QUrl
-from PyQt6.QtWidgets import QInputDialog, QListWidgetItem, QDialog, QVBoxLayout, QTextBrowser, QPushButton, \
-    QPlainTextEdit
+from PyQt6.QtGui import QColor, QDesktopServices, QTextCursor, QTextFormat
+from PyQt6.QtCore import Qt, QUrl, QTimer
+from PyQt6.QtWidgets import QInputDialog, QDialog, QVBoxLayout, QTextBrowser, QPushButton, \
+    QPlainTextEdit, QHBoxLayout, QLabel, QSpinBox, QProgressDialog, QCheckBox, QFileDialog, QTreeView, QLineEdit, \
+    QTableWidget, QTableWidgetItem, QHeaderView, QTextEdit, QMessageBox
 import json
-from ttpbuilder.HighlighterTEWidget import SyntaxHighlighter
-import uuid
+import os
+from ttpbuilder.Library.capture import Capture, collect_captures
+from ttpbuilder.Library.session import SESSION_SUFFIX, append_delta, load_session, save_session
+from ttpbuilder.Library.template_library import TemplateLibrary, library_name
+from ttpbuilder.Library.autotag import propose
+from ttpbuilder.Library.timing import StageTimer
+import tempfile
+import time
+
+TTP_DOCS_URL = "https://ttp.readthedocs.io/en/latest/"
+
+# Lines of a memory-mapped capture held in the editor at once
+WINDOW_LINES = 5000
+# Template lines costing at least this share of the most expensive one are highlighted
+HOT_LINE_SHARE = 0.1
+ANALYSIS_HEADERS = ['Line', 'Cost (ms)', 'Share', 'Matches', 'Attempts', 'Warnings', 'Template line']
+LIBRARY_HEADERS = ['Template', 'Score', 'Anchors found']
+# Fixed columns of the corpus matrix, one fill rate column per template variable follows
+CORPUS_HEADERS = ['Capture', 'Coverage', 'Records', 'Parse (ms)', 'Lines']
+# Export file types and their sink format, None for an indented JSON document
+EXPORT_FILTERS = {
+    'JSON Files (*.json)': None,
+    'NDJSON Records (*.ndjson *.ndjson.gz)': 'records',
+    'CSV Files (*.csv *.csv.gz)': 'csv',
+}
 
 def restrict_to_single_line(self):
     cursor = self.text_edit.textCursor()
@@ -27,19 +49,39 @@ def restrict_to_single_line(self):
         self.text_edit.setTextCursor(cursor)
 
 def show_ttp_help(self):
+    # QtWebEngine brings up Chromium, so it is loaded on first use only, and it is optional
+    try:
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+    except ImportError:
+        if not QDesktopServices.openUrl(QUrl(TTP_DOCS_URL)):
+            show_link_dialog(self, "TTP Help", TTP_DOCS_URL)
+        return
+
     ttp_help_dialog = QDialog(self)
     ttp_help_dialog.setWindowTitle("TTP Help")
 
     layout = QVBoxLayout()
 
     web_view = QWebEngineView()
-    web_view.setUrl(QUrl("https://ttp.readthedocs.io/en/latest/"))
+    web_view.setUrl(QUrl(TTP_DOCS_URL))
 
     layout.addWidget(web_view)
     ttp_help_dialog.setLayout(layout)
 
     ttp_help_dialog.exec()
 
+
+def show_link_dialog(self, title, url):
+    dialog = QDialog(self)
+    dialog.setWindowTitle(title)
+    layout = QVBoxLayout()
+    text_browser = QTextBrowser()
+    text_browser.setHtml(f"QtWebEngine is not installed. Documentation: <a href='{url}'>{url}</a>")
+    text_browser.setOpenExternalLinks(True)
+    layout.addWidget(text_browser)
+    dialog.setLayout(layout)
+    dialog.exec()
+
 def open_basics_dialog(self):
     dialog = QDialog(self)
     dialog.setWindowTitle('Basics - How to Use')
@@ -51,9 +93,11 @@ def open_basics_dialog(self):
     how_to_text = '''
 <ol>
     <li><strong>Paste Sample Data:</strong> Open the app and paste your sample text data into the text editor on the left-hand side.</li>
+    <li><strong>Open Capture:</strong> Large captures can be loaded with File/Open instead of pasting. Only a window of lines is shown at a time, use the scrollbar beside the editor to move it.</li>
     <li><strong>Reset:</strong> Once you past data in the text area, you cannot edit it. Use File/Reset to start over</li>
     <li><strong>Named Selections:</strong> After pasting text data, highlight a section of the text that you want to be a variable in the TTP template. Right-click and choose "Create Named Selection".</li>
-    <li><strong>Variable List:</strong> This will populate the ListWidget on the right with your identified variables. You can edit or remove these as necessary.</li>
+    <li><strong>Auto-tag:</strong> Tools/Auto-tag Variables proposes named selections for IP and MAC addresses, prefixes, interface names and numbers in one pass. Review the proposals in the variable list and delete the ones you do not need.</li>
+    <li><strong>Variable List:</strong> This will populate the list on the right with your identified variables. Click one to edit it; filter and sort the list above it, and select several rows to delete them together.</li>
     <li><strong>Generate Template:</strong> Once you've highlighted all variables of interest, click on the 'Generate Template' button at the bottom to create the TTP template.</li>
 </ol>
         '''
@@ -80,6 +124,110 @@ def show_about_dialog(self):
     about_dialog.exec()
 
 
+def doc_to_offset(self, position):
+    # Map a position in the editor's document to an absolute capture offset
+    if self.capture is None:
+        return position
+    block = self.text_edit.document().findBlock(position)
+    line = self.window_first_line + block.blockNumber()
+    return self.capture.offset_of(line, position - block.position())
+
+
+def offset_to_doc(self, offset):
+    # Inverse of doc_to_offset, None when the offset is outside the loaded window
+    if self.capture is None:
+        return offset
+    line = self.capture.line_of(offset)
+    block = self.text_edit.document().findBlockByNumber(line - self.window_first_line)
+    if line < self.window_first_line or not block.isValid():
+        return None
+    return block.position() + self.capture.column_of(line, offset)
+
+
+def open_capture_file(self):
+    path, _ = QFileDialog.getOpenFileName(self, "Open Capture", "", "Captures (*.txt *.log *.cfg);;All Files (*)")
+    if not path:
+        return
+
+    self.reset_app()
+    # The capture is memory-mapped and only WINDOW_LINES lines are ever in the editor
+    show_capture(self, Capture.from_file(path))
+
+
+def show_capture(self, capture):
+    self.capture = capture
+    last_first_line = max(0, self.capture.line_count - WINDOW_LINES)
+    self.window_scrollbar.setRange(0, last_first_line)
+    self.window_scrollbar.setPageStep(WINDOW_LINES // 2)
+    self.window_scrollbar.setSingleStep(WINDOW_LINES // 10)
+    self.window_scrollbar.setValue(0)
+    self.window_scrollbar.setVisible(last_first_line > 0)
+    load_window(self, 0)
+
+
+def open_session(self):
+    path, _ = QFileDialog.getOpenFileName(self, "Open Session", "", f"Sessions (*{SESSION_SUFFIX});;All Files (*)")
+    if not path:
+        return
+    try:
+        capture, rows = load_session(path)
+    except (OSError, ValueError) as e:
+        self.status_bar.showMessage(f"Could not open session: {e}")
+        return
+
+    self.reset_app()
+    show_capture(self, capture)
+    # One bulk insert; the overlay paints the visible selections afterwards
+    add_named_selections(self, rows)
+    self.session_journal.clear()
+    self.session_path = path
+    self.status_bar.showMessage(f"Opened {path}: {len(rows)} selections")
+
+
+def save_current_session(self, choose_path=False):
+    if self.capture is None:
+        self.status_bar.showMessage("Nothing to save")
+        return
+    path = self.session_path
+    if choose_path or path is None:
+        path, _ = QFileDialog.getSaveFileName(self, "Save Session", "", f"Sessions (*{SESSION_SUFFIX})")
+        if not path:
+            return
+        if not path.endswith(SESSION_SUFFIX):
+            path += SESSION_SUFFIX
+
+    rows = [(selection.start, selection.end, selection.line, selection.ttp_text) for selection in self.selections]
+    save_session(path, self.capture, rows)
+    self.session_journal.clear()
+    self.session_path = path
+    self.status_bar.showMessage(f"Saved {path}")
+
+
+def autosave_session(self):
+    # Only what changed since the last save is appended to the session file
+    if self.session_path is None or not self.session_journal:
+        return
+    try:
+        append_delta(self.session_path, self.session_journal)
+    except OSError as e:
+        self.status_bar.showMessage(f"Autosave failed: {e}")
+    else:
+        self.status_bar.showMessage(f"Autosaved {self.session_path}")
+
+
+def load_window(self, first_line):
+    capture = self.capture
+    last_line = min(first_line + WINDOW_LINES, capture.line_count)
+    self.window_first_line = first_line
+    self.text_edit.setPlainText(capture.text(first_line, last_line))
+    self.text_edit.setReadOnly(True)
+    self.text_label.setText(f"{os.path.basename(capture.path)}: lines {first_line + 1}-{last_line} "
+                            f"of {capture.line_count}")
+
+    # Named selections inside the new window are repainted by the overlay
+    self.selection_overlay.schedule()
+
+
 def name_selection(parent):
     current_theme = parent.current_theme
     cursor = parent.text_edit.textCursor()
@@ -88,99 +236,111 @@ def name_selection(parent):
     if not selected_text:
         return None
 
-    start = cursor.selectionStart()
-    end = cursor.selectionEnd()
-
-    cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
-    start_line = cursor.blockNumber() + 1
-    lines = parent.text_edit.toPlainText().splitlines()
-    original_line_text = lines[start_line - 1]
+    # Selections are stored as absolute offsets into the capture
+    start = doc_to_offset(parent, cursor.selectionStart())
+    end = doc_to_offset(parent, cursor.selectionEnd())
 
     name, ok = QInputDialog.getText(parent, "Name the Selection", "Name:")
 
     if ok and name:
-        new_item = QListWidgetItem(f"{name} {start}:{end} Line No.: {start_line}")
-        new_item.selection_start = start
-        new_item.selection_end = end
-        new_item.selected_text = selected_text
-        new_item.line_pos = start_line
-        new_item.original_line_text = original_line_text
-        new_item.ttp_text =  f"{{{{{name}}}}}"
-        unique_id = str(uuid.uuid4())
-        new_item.unique_id = unique_id
-        parent.named_selections[unique_id] = {
-            'start': start,
-            'end': end,
-            'list_widget_item': new_item
-        }
-
-        parent.list_widget.addItem(new_item)
-
-        # Highlight text
-        highlight_text(parent, start, end)
-
-        return new_item
+        return add_named_selection(parent, start, end, selected_text, f"{{{{{name}}}}}")
 
     return None
 
-def highlight_text(self, start, end, default=False):
-    if default:
-        if self.current_theme == "dark":
-            highlight_color = QColor("#2d2d2d")
-        else:
-            highlight_color = QColor("#ffffff")
-    else:
-        # Detect the current theme
-        current_theme = self.current_theme  # Assume this function exists and returns either 'dark' or 'light'
 
-        # Choose highlight color based on theme
-        if current_theme == 'dark':
-            highlight_color = QColor("green")  # Or any color suitable for dark mode
-        else:
-            highlight_color = QColor("yellow")  # Or any color suitable for light mode
-
-    cursor = self.text_edit.textCursor()
-
-    cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
-    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
-    highlight_format = QTextCharFormat()
-    highlight_format.setBackground(highlight_color)
-
-    cursor.mergeCharFormat(highlight_format)
+def add_named_selection(parent, start, end, selected_text, ttp_text, start_line=None):
+    if start_line is None:
+        start_line = parent.capture.line_of(start) + 1
+    return add_named_selections(parent, [(start, end, start_line, ttp_text)])[0]
+
+
+def add_named_selections(parent, rows):
+    # Bulk insert of (start, end, line, ttp_text) rows, line 1-based; returns the new Selection records
+    selections = parent.selections.add(rows)
+    capture = parent.capture
+    line_texts = {}
+    for selection in selections:
+        line = selection.line - 1
+        line_text = line_texts.get(line)
+        if line_text is None:
+            line_text = line_texts[line] = capture.line_text(line)
+        parent.selection_index.add(selection.key, selection.start, selection.end)
+        parent.session_journal.add(selection.start, selection.end, selection.line, selection.ttp_text)
+        parent.template_spans.add(selection.key, selection.line, line_text, capture.column_of(line, selection.start),
+                                  capture.column_of(line, selection.end), selection.ttp_text)
+    parent.preview_timer.start()
+
+    # Highlight text
+    parent.selection_overlay.schedule()
+
+    return selections
+
+
+def remove_named_selections(parent, selections):
+    parent.selection_index.remove_many(selection.key for selection in selections)
+    for selection in selections:
+        parent.session_journal.remove(selection.start, selection.end)
+        parent.template_spans.remove(selection.key)
+    parent.selections.remove(selection.key for selection in selections)
+    parent.preview_timer.start()
+    parent.selection_overlay.schedule()
+
+
+def auto_tag(self):
+    # Stream proposals from one pass over the capture into the variable list,
+    # one batch of lines per event loop turn so the window stays responsive
+    if self.capture is None or self.auto_tag_timer.isActive():
+        return
+    batches = propose(self.capture, lines_per_batch=500)
+    tagged = [0]
+
+    def add_batch():
+        batch = next(batches, None)
+        if batch is None:
+            self.auto_tag_timer.stop()
+            self.auto_tag_timer.timeout.disconnect()
+            self.list_label.setText(f"Variables: ({tagged[0]} auto-tagged)")
+            return
+
+        # Never propose over something the user already named
+        rows = [(proposal.start, proposal.end, proposal.line + 1, proposal.ttp_text) for proposal in batch
+                if not self.selection_index.overlapping(proposal.start, proposal.end)]
+        add_named_selections(self, rows)
+        tagged[0] += len(rows)
+
+        line = batch[-1].line + 1 if batch else 0
+        self.list_label.setText(f"Variables: (auto-tagging, line {line} of {self.capture.line_count})")
+
+    self.auto_tag_timer.timeout.connect(add_batch)
+    self.auto_tag_timer.start()
 
 
 def generate_template(self):
-    lines_dict = {}
-    template_lines_ordered = []
-    item_count = self.list_widget.count()
-    items = [self.list_widget.item(i) for i in range(item_count)]
-
-    sorted_items = sorted(items, key=lambda item: item.line_pos)
-
-    for item in sorted_items:
-        if hasattr(item, 'ttp_text'):
-            original_line = item.original_line_text
-            if original_line not in lines_dict:
-                lines_dict[original_line] = []
-                template_lines_ordered.append(original_line)
-            lines_dict[original_line].append({
-                'selected_text': item.selected_text,
-                'ttp_text': item.ttp_text
-            })
-
-    template_lines = []
-    for original_line in template_lines_ordered:
-        template_line_temp = original_line
-        for replacement in lines_dict[original_line]:
-            template_line_temp = template_line_temp.replace(replacement['selected_text'], replacement['ttp_text'],
-                                                            1)
-        template_lines.append(template_line_temp)
-
-    template_text = '\n'.join(template_lines)
-    show_template_dialog(self, template_text)
-
-
-def show_template_dialog(self, template):
+    timer = StageTimer()
+    # Template lines are kept up to date as selections change, only changed lines get rendered here
+    with timer.stage('build template'):
+        template_text = self.template_spans.template(group_repeats=self.group_repeats_box.isChecked())
+    show_template_dialog(self, template_text, timer)
+
+
+def update_template_preview(self):
+    group_repeats = self.group_repeats_box.isChecked()
+    state = (self.template_spans.version, group_repeats)
+    if state == self.preview_state:
+        return
+    self.preview_state = state
+    template_text = self.template_spans.template(group_repeats=group_repeats)
+    # Keep the reader's place while the template grows underneath
+    scrollbar = self.template_preview.verticalScrollBar()
+    position = scrollbar.value()
+    self.template_preview.setPlainText(template_text)
+    scrollbar.setValue(position)
+
+
+def show_template_dialog(self, template, timer=None):
+    from ttpbuilder.HighlighterTEWidget import SyntaxHighlighter
+
+    started = time.perf_counter()
     dialog = QDialog(self)
     dialog.setWindowTitle('Generated Template')
 
@@ -193,47 +353,528 @@ def show_template_dialog(self, template):
     template_browser.setMinimumWidth(600)
     self.source_highlighter = SyntaxHighlighter(template_browser.document())
     self.source_highlighter.set_syntax_type("jinja")
-    layout.addWidget(template_browser)
-
-    # Adding the Test Template button to the dialog
+    layout.addWidget(template_browser, 3)
+
+    # Per-line costs from the analyzer, shown once it has run
+    analysis_table = QTableWidget(0, len(ANALYSIS_HEADERS))
+    analysis_table.setHorizontalHeaderLabels(ANALYSIS_HEADERS)
+    analysis_table.horizontalHeader().setStretchLastSection(True)
+    analysis_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+    analysis_table.verticalHeader().setVisible(False)
+    analysis_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    analysis_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+    analysis_table.setVisible(False)
+    analysis_table.cellClicked.connect(lambda row, column: go_to_template_line(
+        template_browser, analysis_table.item(row, 0).data(Qt.ItemDataRole.UserRole)))
+    layout.addWidget(analysis_table, 2)
+    # Highlights refer to the analyzed text, edits invalidate them
+    template_browser.textChanged.connect(lambda: template_browser.setExtraSelections([]))
+
+    # Adding the Test Template button and parse timeout to the dialog
+    test_layout = QHBoxLayout()
+    test_layout.addWidget(QLabel("Timeout:"))
+    timeout_box = QSpinBox()
+    timeout_box.setRange(1, 3600)
+    timeout_box.setSuffix(" s")
+    timeout_box.setValue(self.test_timeout)
+    timeout_box.valueChanged.connect(lambda value: setattr(self, 'test_timeout', value))
+    test_layout.addWidget(timeout_box)
+    cache_box = QCheckBox("Use result cache")
+    cache_box.setChecked(self.use_result_cache)
+    cache_box.toggled.connect(lambda checked: setattr(self, 'use_result_cache', checked))
+    test_layout.addWidget(cache_box)
+    profile_box = QCheckBox("Profile next run")
+    profile_box.setChecked(self.profile_next_run)
+    profile_box.toggled.connect(lambda checked: setattr(self, 'profile_next_run', checked))
+    test_layout.addWidget(profile_box)
+    parallel_box = QCheckBox("Parallel")
+    parallel_box.setToolTip("Split the capture at record boundaries and parse the pieces on all CPU cores")
+    parallel_box.setChecked(self.parallel_test)
+    parallel_box.toggled.connect(lambda checked: setattr(self, 'parallel_test', checked))
+    test_layout.addWidget(parallel_box)
+    prefilter_box = QCheckBox("Prefilter")
+    prefilter_box.setToolTip("Drop capture lines holding none of the template's literal words before ttp sees them")
+    prefilter_box.setChecked(self.prefilter_test)
+    prefilter_box.toggled.connect(lambda checked: setattr(self, 'prefilter_test', checked))
+    test_layout.addWidget(prefilter_box)
+    verify_box = QCheckBox("Verify")
+    verify_box.setToolTip("Also parse the whole capture without splitting or prefiltering and compare the results")
+    verify_box.setChecked(self.verify_test)
+    verify_box.setEnabled(self.parallel_test or self.prefilter_test)
+    verify_box.toggled.connect(lambda checked: setattr(self, 'verify_test', checked))
+    for box in (parallel_box, prefilter_box):
+        box.toggled.connect(lambda: verify_box.setEnabled(parallel_box.isChecked() or prefilter_box.isChecked()))
+    test_layout.addWidget(verify_box)
+    service_layout = QHBoxLayout()
+    service_layout.addWidget(QLabel("Parse service:"))
+    service_edit = QLineEdit(self.parse_service)
+    service_edit.setPlaceholderText("none, parse locally (e.g. 127.0.0.1:8765 or unix:/run/ttpbuilder.sock)")
+    service_edit.setToolTip("Send test parses to a running ttpbuilder-serve; Parallel and profiling apply locally only")
+    service_edit.textChanged.connect(lambda text: setattr(self, 'parse_service', text.strip()))
+    service_layout.addWidget(service_edit)
+    layout.addLayout(service_layout)
     test_button = QPushButton("Test Template")
-    test_button.clicked.connect(lambda: test_template(self, template))
-    layout.addWidget(test_button)
+
+    def run_test():
+        test_template(self, template_browser.toPlainText())
+        # Profiling is one-shot
+        profile_box.setChecked(self.profile_next_run)
+
+    test_button.clicked.connect(run_test)
+    test_layout.addWidget(test_button, 1)
+    analyze_button = QPushButton("Analyze")
+    analyze_button.setToolTip("Time each template line's regex against the sample and highlight the costly ones")
+    analyze_button.clicked.connect(lambda: analyze_template(self, template_browser, analysis_table))
+    test_layout.addWidget(analyze_button)
+    corpus_button = QPushButton("Test Against Corpus...")
+    corpus_button.setToolTip("Run the template over a folder of captures and show how well each variable is filled")
+    corpus_button.clicked.connect(lambda: test_corpus(self, template_browser.toPlainText()))
+    test_layout.addWidget(corpus_button)
+    library_button = QPushButton("Save to Library...")
+    library_button.clicked.connect(lambda: save_to_library(self, template_browser.toPlainText()))
+    test_layout.addWidget(library_button)
+    layout.addLayout(test_layout)
+
+    dialog.setLayout(layout)
+    if timer is not None:
+        timer.add('dialog', time.perf_counter() - started)
+        show_timings(self, 'Generate template', timer, dialog)
+    dialog.exec()
+
+
+def get_template_library(self):
+    if self.template_library is None:
+        self.template_library = TemplateLibrary()
+    return self.template_library
+
+
+def save_to_library(self, template):
+    name, ok = QInputDialog.getText(self, "Save to Library", "Template name:")
+    if not ok or not name:
+        return
+    library = get_template_library(self)
+    name = library_name(name)
+    if name in library:
+        answer = QMessageBox.question(self, "Save to Library", f"Replace the library template '{name}'?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+    library.add(name, template, replace=True)
+    self.status_bar.showMessage(f"Saved template '{name}' to {library.directory}")
+
+
+def show_library_dialog(self):
+    # Library templates ranked by how many of their anchor lines occur in the
+    # current capture; without a capture every template is listed
+    library = get_template_library(self)
+    library.refresh()
+    if self.capture is not None:
+        rows = [(candidate.name, f"{candidate.score:.0%}", f"{candidate.anchors_hit}/{candidate.anchors_total}")
+                for candidate in library.rank(self.capture, limit=50)]
+    else:
+        rows = [(name, '', f"{library.anchor_count(name)}") for name in library.names()]
+
+    dialog = QDialog(self)
+    dialog.setWindowTitle('Template Library')
+    dialog.setMinimumWidth(500)
+    layout = QVBoxLayout()
+    layout.addWidget(QLabel(f"{len(rows)} matching templates in {library.directory}" if self.capture is not None
+                            else f"{len(rows)} templates in {library.directory}"))
+
+    table = QTableWidget(len(rows), len(LIBRARY_HEADERS))
+    table.setHorizontalHeaderLabels(LIBRARY_HEADERS)
+    table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+    table.verticalHeader().setVisible(False)
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+    table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+    for row, values in enumerate(rows):
+        for column, value in enumerate(values):
+            table.setItem(row, column, QTableWidgetItem(value))
+    if rows:
+        table.selectRow(0)
+    layout.addWidget(table)
+
+    def selected_name():
+        items = table.selectedItems()
+        return table.item(items[0].row(), 0).text() if items else None
+
+    def open_selected():
+        name = selected_name()
+        if name:
+            dialog.accept()
+            show_template_dialog(self, library.template(name))
+
+    def test_selected():
+        name = selected_name()
+        if name:
+            test_template(self, library.template(name))
+
+    def remove_selected():
+        name = selected_name()
+        if name:
+            library.remove(name)
+            table.removeRow(table.currentRow())
+
+    button_layout = QHBoxLayout()
+    for label, action in (("Open", open_selected), ("Test", test_selected), ("Remove", remove_selected)):
+        button = QPushButton(label)
+        button.clicked.connect(action)
+        button_layout.addWidget(button)
+    layout.addLayout(button_layout)
+    table.cellDoubleClicked.connect(lambda row, column: open_selected())
 
     dialog.setLayout(layout)
     dialog.exec()
 
 
+def analyze_template(self, template_browser, analysis_table):
+    source_text = self.capture.text() if self.capture else self.text_edit.toPlainText()
+
+    progress = QProgressDialog("Starting analyzer...", "Cancel", 0, 0, self)
+    progress.setWindowTitle('Analyzing Template')
+    progress.setWindowModality(Qt.WindowModality.WindowModal)
+    progress.setMinimumDuration(0)
+
+    job = self.test_runner.start(template_browser.toPlainText(), source_text, timeout=self.test_timeout,
+                                 analyze=True)
+    progress.canceled.connect(self.test_runner.cancel)
+    job.progress.connect(progress.setLabelText)
+    job.finished.connect(lambda report: on_analysis_finished(self, progress, template_browser, analysis_table, report))
+    job.failed.connect(lambda error: on_test_failed(self, progress, error))
+    progress.show()
+
+
+def on_analysis_finished(self, progress, template_browser, analysis_table, report):
+    progress.canceled.disconnect()
+    progress.close()
+
+    total = sum(entry['seconds'] for entry in report) or 1.0
+    hottest = max((entry['seconds'] for entry in report), default=0.0) or 1.0
+    report = sorted(report, key=lambda entry: entry['seconds'], reverse=True)
+
+    analysis_table.setSortingEnabled(False)
+    analysis_table.setRowCount(len(report))
+    for row, entry in enumerate(report):
+        values = [entry['line'] + 1, round(entry['seconds'] * 1000, 3), f"{entry['seconds'] / total:.0%}",
+                  entry['matches'], entry['attempts'], ', '.join(entry['warnings']), entry['text']]
+        for column, value in enumerate(values):
+            item = QTableWidgetItem()
+            # Numbers go in as data so that sorting by a column is numeric
+            item.setData(Qt.ItemDataRole.DisplayRole, value)
+            analysis_table.setItem(row, column, item)
+        analysis_table.item(row, 0).setData(Qt.ItemDataRole.UserRole, entry['line'])
+    analysis_table.setSortingEnabled(True)
+    analysis_table.sortItems(1, Qt.SortOrder.DescendingOrder)
+    analysis_table.setVisible(True)
+
+    # Hot lines get a red background, stronger the closer they are to the most expensive line
+    selections = []
+    document = template_browser.document()
+    for entry in report:
+        share = entry['seconds'] / hottest
+        block = document.findBlockByNumber(entry['line'])
+        if share < HOT_LINE_SHARE or not block.isValid():
+            break
+        selection = QTextEdit.ExtraSelection()
+        selection.cursor = QTextCursor(block)
+        selection.format.setBackground(QColor(255, 0, 0, int(40 + 120 * share)))
+        selection.format.setProperty(QTextFormat.Property.FullWidthSelection, True)
+        selections.append(selection)
+    template_browser.setExtraSelections(selections)
+
+    slow = sum(1 for entry in report if entry['warnings'])
+    self.status_bar.showMessage(f"Analyzed {len(report)} template lines: {total * 1000:.1f} ms of regex scanning, "
+                                f"{slow} with warnings")
+
+
+def go_to_template_line(template_browser, line):
+    cursor = QTextCursor(template_browser.document().findBlockByNumber(line))
+    template_browser.setTextCursor(cursor)
+    template_browser.centerCursor()
+    template_browser.setFocus()
+
+
 def test_template(self, template):
-    # Get the source text from QPlainTextEdit
-    source_text = self.text_edit.toPlainText()
+    timer = StageTimer()
+    # Get the source text from the capture, the editor may only hold a window of it
+    with timer.stage('read capture'):
+        source_text = self.capture.text() if self.capture else self.text_edit.toPlainText()
+
+    options = {'use_result_cache': self.use_result_cache, 'prefilter': self.prefilter_test, 'verify': self.verify_test}
+    if self.profile_next_run:
+        self.profile_next_run = False
+        options['profile'] = os.path.join(tempfile.gettempdir(),
+                                          f"ttpbuilder-{time.strftime('%Y%m%d-%H%M%S')}.pstats")
+
+    # Parse in the background runner so a slow or runaway parse never blocks the UI
+    progress = QProgressDialog("Starting parser...", "Cancel", 0, 0, self)
+    progress.setWindowTitle('Testing Template')
+    progress.setWindowModality(Qt.WindowModality.WindowModal)
+    progress.setMinimumDuration(0)
+
+    started = time.perf_counter()
+    if self.parse_service:
+        transfer_stage = 'service request'
+        job = self.test_runner.start_remote(self.parse_service, template, source_text, timeout=self.test_timeout,
+                                            prefilter=self.prefilter_test, verify=self.verify_test)
+    elif self.parallel_test:
+        # Chunks are cut from the capture itself, pasted text gets an index first
+        capture = self.capture or Capture.from_text(source_text)
+        transfer_stage = 'transfer' if self.test_runner.has_pool() else 'pool startup'
+        job = self.test_runner.start_chunked(template, capture, timeout=self.test_timeout,
+                                             verify=self.verify_test, prefilter=self.prefilter_test)
+    else:
+        transfer_stage = 'transfer' if self.test_runner.has_worker() else 'worker startup'
+        job = self.test_runner.start(template, source_text, timeout=self.test_timeout, **options)
+    progress.canceled.connect(self.test_runner.cancel)
+    job.progress.connect(progress.setLabelText)
+    job.finished.connect(
+        lambda payload: on_test_finished(self, progress, timer, started, transfer_stage, *payload))
+    job.failed.connect(lambda error: on_test_failed(self, progress, error))
+    progress.show()
+
+
+def test_corpus(self, template):
+    from ttpbuilder.Library.coverage import column_label, template_columns
+
+    directory = QFileDialog.getExistingDirectory(self, 'Test Against Corpus')
+    if not directory:
+        return
+    paths = collect_captures([directory])
+    columns = template_columns(template)
+    if not paths or not columns:
+        QMessageBox.information(self, 'Test Against Corpus', 'No captures in that folder' if not paths
+                                else 'The template has no variables to measure')
+        return
 
-    # Use TTP to parse
-    try:
-        parser = ttp(data=source_text, template=template)
-        parser.parse()
-        results = parser.result(format="json")[0]
-        try:
-            results = json.loads(results)
-            # results = json.dumps(results, indent=2)
-        except:
-            pass
-        # Show the results in a custom dialog
-    except Exception as e:
-        print(f"TTP Error: {e}")
-        results = [{"error":f"ttp parser failed: {e}"}]
-    show_results_dialog(self, json.dumps(results, indent=4))
-
-def show_results_dialog(self, results):
+    dialog = QDialog(self)
+    dialog.setWindowTitle('Corpus Coverage')
+    dialog.resize(900, 600)
+    layout = QVBoxLayout()
+    status_label = QLabel(f"Testing {len(paths)} captures in {directory}...")
+    layout.addWidget(status_label)
+
+    headers = CORPUS_HEADERS + [column_label(column) for column in columns]
+    table = QTableWidget(0, len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+    table.verticalHeader().setVisible(False)
+    table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+    table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+    layout.addWidget(table)
+
+    def add_rows(rows):
+        # Sorting is suspended while rows go in, then the whole batch is sorted once
+        sort_column = table.horizontalHeader().sortIndicatorSection()
+        sort_order = table.horizontalHeader().sortIndicatorOrder()
+        table.setSortingEnabled(False)
+        for row in rows:
+            add_corpus_row(table, row, directory)
+        table.setSortingEnabled(True)
+        table.sortByColumn(sort_column, sort_order)
+
+    def open_selected():
+        items = table.selectedItems()
+        if not items:
+            return
+        path = table.item(items[0].row(), 0).data(Qt.ItemDataRole.UserRole)
+        dialog.accept()
+        self.reset_app()
+        show_capture(self, Capture.from_file(path))
+
+    button_layout = QHBoxLayout()
+    stop_button = QPushButton("Stop")
+    stop_button.clicked.connect(self.test_runner.cancel)
+    button_layout.addWidget(stop_button)
+    button_layout.addStretch()
+    open_button = QPushButton("Open in Builder")
+    open_button.clicked.connect(open_selected)
+    button_layout.addWidget(open_button)
+    layout.addLayout(button_layout)
+    table.cellDoubleClicked.connect(lambda row, column: open_selected())
+
+    def finished(message):
+        stop_button.setEnabled(False)
+        status_label.setText(f"{message}: {table.rowCount()} of {len(paths)} captures in {directory}, "
+                             f"lowest coverage first, then slowest")
+
+    # Lowest coverage first, the slowest first among equal coverage
+    table.setSortingEnabled(True)
+    table.sortByColumn(1, Qt.SortOrder.AscendingOrder)
+    job = self.test_runner.start_corpus(template, columns, paths, prefilter=self.prefilter_test)
+    job.partial.connect(add_rows)
+    job.progress.connect(status_label.setText)
+    job.finished.connect(lambda count: finished('Tested'))
+    job.failed.connect(finished)
+    # Closing the dialog stops a run still going
+    dialog.finished.connect(lambda result: stop_button.isEnabled() and self.test_runner.cancel())
+    dialog.setLayout(layout)
+    dialog.exec()
+
+
+class CoverageItem(QTableWidgetItem):
+    # Sorts by coverage, then by parse time the other way round, so the
+    # ascending order puts the slowest of equally covered captures first
+    def __lt__(self, other):
+        return self.data(Qt.ItemDataRole.UserRole) < other.data(Qt.ItemDataRole.UserRole)
+
+
+def add_corpus_row(table, row, directory):
+    index = table.rowCount()
+    table.insertRow(index)
+    capture_item = QTableWidgetItem(os.path.relpath(row['capture'], directory))
+    capture_item.setData(Qt.ItemDataRole.UserRole, row['capture'])
+    if row['error']:
+        capture_item.setToolTip(row['error'])
+    table.setItem(index, 0, capture_item)
+    values = [round(row['coverage'] * 100, 1), row['records'], round(row['seconds'] * 1e3, 1), row['lines']]
+    values.extend(round(fill * 100, 1) for fill in row['fills'])
+    for column, value in enumerate(values, 1):
+        item = CoverageItem() if column == 1 else QTableWidgetItem()
+        # Numbers, not text, so the columns sort numerically
+        item.setData(Qt.ItemDataRole.DisplayRole, value)
+        table.setItem(index, column, item)
+    table.item(index, 1).setData(Qt.ItemDataRole.UserRole, (values[0], -values[2]))
+    # Coverage and fill rates are shaded by how far they fall short of 100%
+    shaded = [(1, row['coverage'])] + list(enumerate(row['fills'], len(CORPUS_HEADERS)))
+    for column, fill in shaded:
+        if fill < 1:
+            table.item(index, column).setBackground(QColor(255, 0, 0, int(40 + 120 * (1 - fill))))
+
+
+def on_test_finished(self, progress, timer, started, transfer_stage, results, cache_stats):
+    # Whatever the worker did not account for went to queueing and pickling the
+    # job and its results, plus spawning the process on a cold start
+    worker_time = sum(cache_stats['timings'].values())
+    timer.update(cache_stats['timings'])
+    timer.add(transfer_stage, max(0.0, time.perf_counter() - started - worker_time))
+    progress.canceled.disconnect()
+    progress.close()
+    # Show the results in a custom dialog
+    parser_stats = cache_stats['parser_cache']
+    if parser_stats:
+        status = f"Parser cache: {parser_stats['hits']} hits, {parser_stats['misses']} misses, " \
+                 f"{parser_stats['size']}/{parser_stats['max_size']} templates"
+    else:
+        chunked = cache_stats['chunked']
+        if chunked['serial']:
+            status = f"Parallel: parsed in one piece, the template has {chunked['serial']}"
+        else:
+            status = f"Parallel: {chunked['chunks']} chunks cut at {chunked['strategy']} boundaries"
+        if chunked['prefiltered']:
+            status += ", each prefiltered"
+        if chunked['mismatch']:
+            status += f"\nChunked results differ from a plain serial parse at {chunked['mismatch']}, " \
+                      f"showing the serial results"
+        elif chunked['verified']:
+            status += ", same results as a serial parse"
+    if cache_stats.get('service'):
+        status += f" | Service: {cache_stats['service']}"
+    result_stats = cache_stats['result_cache']
+    if result_stats:
+        status += f" | Result cache: {result_stats['hits']} hits, {result_stats['misses']} misses"
+    prefilter = cache_stats['prefilter']
+    if prefilter:
+        if prefilter['active']:
+            status += f"\nPrefilter: kept {prefilter['kept']} of {prefilter['lines']} lines"
+        else:
+            status += "\nPrefilter: off, a template line can match without any literal text"
+        if prefilter['mismatch']:
+            status += f"\nPrefiltered results differ from an unfiltered parse at {prefilter['mismatch']}, " \
+                      f"showing the unfiltered results"
+        elif prefilter['verified']:
+            status += ", same results as an unfiltered parse"
+    if cache_stats['profile']:
+        status += f"\nProfile written to {cache_stats['profile']}"
+    show_results_dialog(self, results, status, timer)
+
+
+def on_test_failed(self, progress, error):
+    progress.canceled.disconnect()
+    progress.close()
+    print(f"TTP Error: {error}")
+    show_results_dialog(self, [{"error": error}])
+
+def show_results_dialog(self, results, status=None, timer=None):
+    from ttpbuilder.Library.result_model import ResultTreeModel, filter_results
+
+    # results is ttp's native structure; the tree only builds rows as they are expanded
+    started = time.perf_counter()
     dialog = QDialog(self)
     dialog.setWindowTitle('TTP Results')
 
     layout = QVBoxLayout()
 
-    result_browser = QTextBrowser()
-    result_browser.setMinimumWidth(500)
-    result_browser.setPlainText(results)
-    layout.addWidget(result_browser)
+    filter_edit = QLineEdit()
+    filter_edit.setPlaceholderText('Filter keys and values...')
+    layout.addWidget(filter_edit)
+
+    model = ResultTreeModel(results, dialog)
+    result_view = QTreeView()
+    result_view.setMinimumWidth(500)
+    result_view.setUniformRowHeights(True)
+    result_view.setModel(model)
+    result_view.setColumnWidth(0, 250)
+    layout.addWidget(result_view)
+
+    def apply_filter():
+        text = filter_edit.text().strip()
+        model.set_results((filter_results(results, text) or []) if text else results)
+        if text:
+            result_view.expandToDepth(2)
+
+    # Filtering walks the whole result, so wait for typing to pause
+    filter_timer = QTimer(dialog)
+    filter_timer.setSingleShot(True)
+    filter_timer.setInterval(300)
+    filter_timer.timeout.connect(apply_filter)
+    filter_edit.textChanged.connect(filter_timer.start)
+
+    bottom_layout = QHBoxLayout()
+    if status:
+        bottom_layout.addWidget(QLabel(status))
+    bottom_layout.addStretch()
+    export_button = QPushButton('Export...')
+    capture_name = self.capture.path if self.capture is not None and self.capture.path else ''
+    export_button.clicked.connect(lambda: export_results(dialog, model.results(), capture_name))
+    bottom_layout.addWidget(export_button)
+    layout.addLayout(bottom_layout)
 
     dialog.setLayout(layout)
+    if timer is not None:
+        timer.add('results view', time.perf_counter() - started)
+        show_timings(self, 'Test template', timer, dialog)
     dialog.exec()
+
+
+def show_timings(self, label, timer, dialog=None):
+    self.status_bar.showMessage(f"{label}: {timer.summary()}")
+    if dialog is None:
+        return
+
+    # Measure until the dialog's own event loop first gets round to timers, i.e. after its first paint
+    started = time.perf_counter()
+
+    def painted():
+        timer.add('first paint', time.perf_counter() - started)
+        self.status_bar.showMessage(f"{label}: {timer.summary()}")
+
+    QTimer.singleShot(0, painted)
+
+
+def export_results(self, results, capture_name=''):
+    from ttpbuilder.Library.sinks import SINKS
+
+    file_path, selected = QFileDialog.getSaveFileName(self, 'Export Results', '', ';;'.join(EXPORT_FILTERS))
+    if not file_path:
+        return
+    sink_format = EXPORT_FILTERS.get(selected)
+    if sink_format is None:
+        # json.dump writes chunk by chunk, the full document is never held as one string
+        with open(file_path, 'w') as file:
+            json.dump(results, file, indent=4)
+        return
+    # Flattened, one record per line or row; a .gz name is compressed
+    with SINKS[sink_format](file_path) as sink:
+        sink.write(capture_name, results)
@@ -0,0 +1,136 @@
+# batch.py
+# Headless batch parser: run a builder template over many captures in parallel.
+# This module must never import PyQt6.
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ttpbuilder.Library.capture import Capture, collect_captures
+from ttpbuilder.Library.chunked import STRATEGIES, parse_chunked, serial_reason
+from ttpbuilder.Library.core import parse_text, parser_cache, read_capture
+from ttpbuilder.Library.prefilter import parse_prefiltered
+from ttpbuilder.Library.result_cache import DEFAULT_MAX_BYTES, ResultCache
+from ttpbuilder.Library.sinks import DEFAULT_FLUSH_SECONDS, FORMATS, open_sink
+
+_template = None
+_result_cache = None
+_prefilter = False
+_verify = False
+
+
+def bounded_map(executor, function, items, window):
+    # Like executor.map, in order, but with at most window items submitted and
+    # not yet consumed. executor.map submits everything at once and holds every
+    # finished result until the ones before it are written.
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _init_worker(template, cache_dir=None, cache_bytes=DEFAULT_MAX_BYTES, use_cache=True, prefilter=False,
+                 verify=False):
+    global _template, _result_cache, _prefilter, _verify
+    _template = template
+    _prefilter = prefilter
+    _verify = verify
+    _result_cache = ResultCache(cache_dir, cache_bytes) if use_cache else None
+
+
+def _parse_capture(path):
+    try:
+        data = read_capture(path)
+        if not _prefilter:
+            return path, parse_text(_template, data, cache=parser_cache, result_cache=_result_cache), None
+        results, info = parse_prefiltered(_template, data, cache=parser_cache, result_cache=_result_cache,
+                                          verify=_verify)
+    except Exception as e:
+        return path, None, f"ttp parser failed: {e}"
+    if info['mismatch']:
+        return path, results, f"prefiltered results differ from an unfiltered parse at {info['mismatch']}"
+    return path, results, None
+
+
+def _parse_chunked(executor, template, path, workers, args):
+    capture = Capture.from_file(path)
+    try:
+        results, info = parse_chunked(template, capture, executor.map, workers=workers, chunk_lines=args.chunk_lines,
+                                      strategy=args.boundaries, verify=args.verify, prefilter=args.prefilter)
+    except Exception as e:
+        return None, f"ttp parser failed: {e}"
+    finally:
+        capture.close()
+    if info['mismatch']:
+        return results, f"chunked results differ from a serial parse at {info['mismatch']}"
+    return results, None
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog='ttpbuilder-batch',
+                                         description='Parse device captures with a TTP template, without the GUI.')
+    arg_parser.add_argument('template', help='TTP template file')
+    arg_parser.add_argument('captures', nargs='+', help='capture files, directories or glob patterns')
+    arg_parser.add_argument('-p', '--pattern', default='*', help='file pattern used inside directories (default: *)')
+    arg_parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                            help='number of worker processes (default: CPU count)')
+    arg_parser.add_argument('-o', '--output', help='write results here instead of stdout, gzip-compressed for .gz')
+    arg_parser.add_argument('-f', '--format', choices=FORMATS, default='ndjson',
+                            help='ndjson: one JSON document per capture; records: one JSON document per flattened '
+                                 'record; csv: one row per flattened record (default: %(default)s)')
+    arg_parser.add_argument('--gzip', action='store_true', help='gzip-compress the output whatever its name')
+    arg_parser.add_argument('--flush-seconds', type=float, default=DEFAULT_FLUSH_SECONDS,
+                            help='flush the output at most this often (default: %(default)s)')
+    arg_parser.add_argument('--no-cache', action='store_true', help='bypass the on-disk result cache')
+    arg_parser.add_argument('--cache-dir', help='result cache directory (default: ~/.cache/ttpbuilder/results)')
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                            help='result cache size cap in MB (default: %(default)s)')
+    arg_parser.add_argument('--chunked', action='store_true',
+                            help='split each capture at record boundaries and parse the pieces across the workers, '
+                                 'for a few huge captures; bypasses the result cache')
+    arg_parser.add_argument('--chunk-lines', type=int,
+                            help='target lines per chunk (default: the capture split evenly over the workers)')
+    arg_parser.add_argument('--boundaries', choices=STRATEGIES, default='auto',
+                            help='where chunks may be cut: template group starts, device prompts or blank lines '
+                                 '(default: auto, group starts when the template has groups)')
+    arg_parser.add_argument('--prefilter', action='store_true',
+                            help="drop capture lines holding none of the template's literal words before parsing")
+    arg_parser.add_argument('--verify', action='store_true',
+                            help='with --chunked or --prefilter, also parse each capture plainly and report captures '
+                                 'whose results differ; the plain results are written')
+    args = arg_parser.parse_args(argv)
+
+    template = read_capture(args.template)
+    captures = collect_captures(args.captures, args.pattern)
+    if not captures:
+        arg_parser.error('no capture files found')
+
+    workers = max(1, args.workers)
+    failures = 0
+    if args.chunked and serial_reason(template):
+        print(f"{args.template}: the template has {serial_reason(template)}, captures are parsed in one piece",
+              file=sys.stderr)
+    with open_sink(args.format, args.output, compress=args.gzip or None, flush_seconds=args.flush_seconds) as sink, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(template, args.cache_dir, args.cache_size * 1024 * 1024,
+                                          not args.no_cache, args.prefilter, args.verify)) as executor:
+        # Written in capture order as they finish; only a few captures' results are held at a time
+        if args.chunked:
+            parsed = ((path, *_parse_chunked(executor, template, path, workers, args)) for path in captures)
+        else:
+            parsed = bounded_map(executor, _parse_capture, captures, workers * 2)
+        for path, results, error in parsed:
+            if error:
+                failures += 1
+                print(f"{path}: {error}", file=sys.stderr)
+            sink.write(path, results, error)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
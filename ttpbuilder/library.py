@@ -0,0 +1,75 @@
+# library.py
+# Command line access to the template library: add and list templates, and
+# rank library templates for captures. This module must never import PyQt6.
+import argparse
+import json
+import os
+import sys
+
+from ttpbuilder.Library.capture import Capture, collect_captures
+from ttpbuilder.Library.core import read_capture
+from ttpbuilder.Library.template_library import TemplateLibrary, library_name
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog='ttpbuilder-library',
+                                         description='Manage the template library and pick templates for captures.')
+    arg_parser.add_argument('--library', help='library directory (default: ~/.local/share/ttpbuilder/templates)')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    add_parser = commands.add_parser('add', help='copy template files into the library')
+    add_parser.add_argument('templates', nargs='+', help='TTP template files, named after the file')
+    add_parser.add_argument('-f', '--force', action='store_true', help='replace library templates of the same name')
+
+    remove_parser = commands.add_parser('remove', help='remove templates from the library')
+    remove_parser.add_argument('names', nargs='+')
+
+    commands.add_parser('list', help='list library templates and their anchor counts')
+
+    rank_parser = commands.add_parser('rank', help='rank library templates for each capture')
+    rank_parser.add_argument('captures', nargs='+', help='capture files, directories or glob patterns')
+    rank_parser.add_argument('-p', '--pattern', default='*', help='file pattern used inside directories (default: *)')
+    rank_parser.add_argument('-n', '--limit', type=int, default=5, help='candidates per capture (default: 5)')
+    args = arg_parser.parse_args(argv)
+
+    library = TemplateLibrary(args.library)
+    failures = 0
+    if args.command == 'add':
+        for path in args.templates:
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                print(library.add(name, read_capture(path), replace=args.force))
+            except FileExistsError:
+                print(f"{path}: template {library_name(name)!r} is already in the library, use --force to replace it",
+                      file=sys.stderr)
+                failures += 1
+    elif args.command == 'remove':
+        for name in args.names:
+            try:
+                library.remove(name)
+            except FileNotFoundError:
+                print(f"{name}: no such template in the library", file=sys.stderr)
+                failures += 1
+    elif args.command == 'list':
+        for name in library.names():
+            print(f"{name}\t{library.anchor_count(name)} anchors")
+    elif args.command == 'rank':
+        captures = collect_captures(args.captures, args.pattern)
+        if not captures:
+            arg_parser.error('no capture files found')
+        # One JSON document per capture and line, best candidate first
+        for path in captures:
+            capture = Capture.from_file(path)
+            try:
+                candidates = library.rank(capture, args.limit)
+            finally:
+                capture.close()
+            print(json.dumps({'capture': path, 'candidates': [
+                {'template': candidate.name, 'score': round(candidate.score, 3),
+                 'anchors_hit': candidate.anchors_hit, 'anchors_total': candidate.anchors_total}
+                for candidate in candidates]}))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# serve.py
+# Long-lived parse service. The templates of a directory are compiled once in
+# every worker process and stay warm, captures are posted over localhost HTTP
+# or a Unix socket and parsed concurrently on the worker pool.
+# This module must never import PyQt6.
+#
+#   POST /parse/<name>[?prefilter=1&verify=1]   body: the capture text
+#   POST /parse                                 body: {"template", "text", "prefilter", "verify"}
+#   GET  /templates
+#   GET  /stats
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ttpbuilder.Library.core import parse_text, parser_cache, read_capture
+from ttpbuilder.Library.prefilter import parse_prefiltered
+from ttpbuilder.Library.service_client import DEFAULT_PORT
+from ttpbuilder.Library.template_library import TEMPLATE_SUFFIX, default_library_dir
+from ttpbuilder.Library.timing import StageTimer
+
+DEFAULT_MAX_REQUEST_MB = 256
+# Latencies kept for the percentiles, and the span throughput is measured over
+LATENCY_WINDOW = 1000
+THROUGHPUT_SECONDS = 60
+# Ad hoc templates cached per worker on top of the served ones
+AD_HOC_TEMPLATES = 16
+
+_templates = {}
+
+
+def load_templates(directory):
+    templates = {}
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(TEMPLATE_SUFFIX):
+            templates[file_name[:-len(TEMPLATE_SUFFIX)]] = read_capture(os.path.join(directory, file_name))
+    return templates
+
+
+def _init_worker(templates):
+    global _templates
+    _templates = templates
+    parser_cache.max_size = max(parser_cache.max_size, len(templates) + AD_HOC_TEMPLATES)
+    for template in templates.values():
+        # A broken template is reported when it is first used
+        try:
+            parser_cache.warm(template)
+        except Exception:
+            pass
+
+
+def _parse(name, template, data, prefilter, verify):
+    # Runs in a worker. Named templates are looked up here so only the capture is sent over.
+    if template is None:
+        template = _templates[name]
+    timer = StageTimer()
+    if prefilter:
+        results, info = parse_prefiltered(template, data, cache=parser_cache, timer=timer, verify=verify)
+    else:
+        info = None
+        results = parse_text(template, data, cache=parser_cache, timer=timer)
+    return results, {'timings': timer.stages, 'prefilter': info, 'parser_cache': parser_cache.stats()}
+
+
+class ServiceStats:
+    # Request counters. Percentiles cover the last LATENCY_WINDOW requests,
+    # throughput the requests finished in the last THROUGHPUT_SECONDS.
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.bytes_parsed = 0
+        self.latency_total = 0.0
+        self.per_template = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, template, size, latency, failed):
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.failures += failed
+            self.bytes_parsed += size
+            self.latency_total += latency
+            self.per_template[template] = self.per_template.get(template, 0) + 1
+            self._latencies.append(latency)
+            self._finished.append(now)
+            self._expire(now)
+
+    def _expire(self, now):
+        while self._finished and self._finished[0] < now - THROUGHPUT_SECONDS:
+            self._finished.popleft()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            latencies = sorted(self._latencies)
+            uptime = now - self.started
+
+            def percentile(share):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1e3, 3)
+
+            return {
+                'uptime_s': round(uptime, 1),
+                'requests': self.requests,
+                'failures': self.failures,
+                'in_flight': self.in_flight,
+                'bytes_parsed': self.bytes_parsed,
+                'mean_ms': round(self.latency_total / self.requests * 1e3, 3) if self.requests else None,
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'p99_ms': percentile(0.99),
+                'max_ms': percentile(1.0),
+                'requests_per_s': round(len(self._finished) / min(THROUGHPUT_SECONDS, max(uptime, 1e-3)), 3),
+                'templates': dict(self.per_template),
+            }
+
+
+class ParseHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so a collector can send capture after capture on one connection
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/templates':
+            self._reply(200, {'templates': sorted(self.server.templates)})
+        elif path == '/stats':
+            stats = self.server.stats.snapshot()
+            stats['workers'] = self.server.workers
+            self._reply(200, stats)
+        else:
+            self._reply(404, {'error': f"no such resource: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/parse' and not url.path.startswith('/parse/'):
+            self._discard_body()
+            self._reply(404, {'error': f"no such resource: {url.path}"})
+            return
+        body = self._read_body()
+        if body is None:
+            return
+
+        if url.path == '/parse':
+            try:
+                request = json.loads(body)
+                name = request.get('name')
+                template = request.get('template')
+                text = request['text']
+                prefilter = bool(request.get('prefilter'))
+                verify = bool(request.get('verify'))
+                if not isinstance(text, str) or not isinstance(template or name, str):
+                    raise ValueError
+            except (ValueError, KeyError, AttributeError):
+                self._reply(400, {'error': 'expected a JSON object with "text" and "template" or "name"'})
+                return
+        else:
+            name = unquote(url.path[len('/parse/'):])
+            template = None
+            text = body.decode('utf-8', errors='replace')
+            query = parse_qs(url.query)
+            prefilter = query.get('prefilter', ['0'])[0] not in ('0', '')
+            verify = query.get('verify', ['0'])[0] not in ('0', '')
+        if template is None and name not in self.server.templates:
+            self._reply(404, {'error': f"no such template: {name}"})
+            return
+        self._parse(name, template, text, len(body), prefilter, verify)
+
+    def _parse(self, name, template, text, size, prefilter, verify):
+        stats = self.server.stats
+        stats.begin()
+        started = time.perf_counter()
+        failed = True
+        try:
+            job = self.server.pool.apply_async(_parse, (name if template is None else None, template, text,
+                                                        prefilter, verify))
+            results, info = job.get(self.server.timeout)
+        except multiprocessing.TimeoutError:
+            # The worker finishes the parse regardless, only the answer is dropped
+            self._reply(504, {'error': f"ttp parser timed out after {self.server.timeout} seconds"})
+        except Exception as e:
+            self._reply(500, {'error': f"ttp parser failed: {e}"})
+        else:
+            failed = bool(info['prefilter'] and info['prefilter']['mismatch'])
+            self._reply(200, {'template': name, 'results': results,
+                              'latency_ms': round((time.perf_counter() - started) * 1e3, 3), **info})
+        finally:
+            stats.end(name or 'ad hoc', size, time.perf_counter() - started, failed)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self._reply(411, {'error': 'Content-Length required'})
+            return None
+        if length > self.server.max_request_bytes:
+            self.close_connection = True
+            self._reply(413, {'error': f"request larger than {self.server.max_request_bytes} bytes"})
+            return None
+        return self.rfile.read(length)
+
+    def _discard_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= self.server.max_request_bytes:
+            self.rfile.read(length)
+        else:
+            self.close_connection = True
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog='ttpbuilder-serve',
+                                         description='Keep templates compiled in a worker pool and parse captures '
+                                                     'posted over localhost HTTP or a Unix socket.')
+    arg_parser.add_argument('--templates', help='directory of .ttp templates to serve '
+                                                '(default: the template library, ~/.local/share/ttpbuilder/templates)')
+    arg_parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on (default: %(default)s)')
+    arg_parser.add_argument('--socket', help='listen on this Unix socket path instead of TCP')
+    arg_parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                            help='number of worker processes (default: CPU count)')
+    arg_parser.add_argument('--timeout', type=float, default=60,
+                            help='seconds before a request gives up on its parse (default: %(default)s)')
+    arg_parser.add_argument('--max-request', type=int, default=DEFAULT_MAX_REQUEST_MB,
+                            help='largest accepted request in MB (default: %(default)s)')
+    arg_parser.add_argument('-v', '--verbose', action='store_true', help='log every request to stderr')
+    args = arg_parser.parse_args(argv)
+
+    directory = args.templates or default_library_dir()
+    if not os.path.isdir(directory):
+        arg_parser.error(f"template directory not found: {directory}")
+    templates = load_templates(directory)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, ParseHandler)
+        address = f"unix:{args.socket}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ParseHandler)
+        address = f"http://{args.host}:{server.server_address[1]}"
+
+    # Workers start and compile the templates right away, not on the first request
+    workers = max(1, args.workers)
+    server.pool = multiprocessing.get_context('spawn').Pool(workers, initializer=_init_worker,
+                                                            initargs=(templates,))
+    server.templates = templates
+    server.workers = workers
+    server.timeout = args.timeout
+    server.max_request_bytes = args.max_request * 1024 * 1024
+    server.verbose = args.verbose
+    server.stats = ServiceStats()
+    print(f"Serving {len(templates)} templates from {directory} on {address} with {workers} workers",
+          file=sys.stderr)
+    # A service manager stops us with SIGTERM, shut the pool and socket down as on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        server.pool.terminate()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,22 @@
-from PyQt6.QtCore import Qt, QEvent
-from PyQt6.QtGui import QTextCursor, QAction
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPlainTextEdit, QListWidget, QMenu, \
-    QMenuBar, QPushButton, QDialog, QLabel, QLineEdit, QSplitter, QHBoxLayout
-
-from ttpbuilder.Library.util import show_ttp_help, name_selection, generate_template, highlight_text, \
-    show_about_dialog, open_basics_dialog, restrict_to_single_line
+import os
+
+from PyQt6.QtCore import Qt, QEvent, QTimer
+from PyQt6.QtGui import QAction
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPlainTextEdit, QTableView, QMenu, \
+    QMenuBar, QPushButton, QDialog, QLabel, QLineEdit, QSplitter, QHBoxLayout, QScrollBar, \
+    QCheckBox, QStatusBar, QComboBox, QAbstractItemView, QHeaderView
+
+from ttpbuilder.Library.util import show_ttp_help, name_selection, generate_template, \
+    show_about_dialog, open_basics_dialog, restrict_to_single_line, open_capture_file, load_window, doc_to_offset, \
+    auto_tag, open_session, save_current_session, autosave_session, show_library_dialog, update_template_preview, \
+    remove_named_selections
+from ttpbuilder.Library.capture import Capture
+from ttpbuilder.Library.session import SessionJournal
+from ttpbuilder.Library.selection_index import SelectionIndex
+from ttpbuilder.Library.selection_model import SORT_ORDERS, SelectionModel
+from ttpbuilder.Library.selection_overlay import SelectionOverlay
+from ttpbuilder.Library.template_spans import TemplateSpans
+from ttpbuilder.Library.test_runner import TemplateTestRunner
 
 
 from PyQt6.QtGui import QMouseEvent
@@ -22,17 +34,34 @@ class ClickablePlainTextEdit(QPlainTextEdit):
         position = cursor.position()
 
         # Check if clicked text corresponds to a named selection
-        for unique_id, data in self.parent.named_selections.items():
-            if data['start'] <= position <= data['end']:
-                self.parent.customize_ttp_entry(data['list_widget_item'])
-                break
+        key = self.parent.selection_at(position)
+        if key is not None:
+            self.parent.customize_ttp_entry(self.parent.selections.get(key))
 
 
 class TTPGuiUI(QWidget):
     def __init__(self):
         super().__init__()
         self.initialize_theme("dark")
-        self.named_selections = {}
+        self.selections = SelectionModel(self)
+        self.selection_index = SelectionIndex()
+        self.template_spans = TemplateSpans()
+        self.preview_state = None
+        self.hover_clickable = False
+        self.capture = None
+        self.window_first_line = 0
+        self.test_timeout = 30
+        self.use_result_cache = True
+        self.profile_next_run = False
+        self.parallel_test = False
+        self.prefilter_test = False
+        self.verify_test = False
+        # Address of a ttpbuilder-serve to test templates on, empty to parse locally
+        self.parse_service = os.environ.get('TTPBUILDER_SERVICE', '')
+        self.session_path = None
+        self.session_journal = SessionJournal()
+        self.template_library = None
+        self.test_runner = TemplateTestRunner(self)
         self.initUI()
 
     def initUI(self):
@@ -43,6 +72,7 @@ class TTPGuiUI(QWidget):
         # Create Menu Bar
         menubar = QMenuBar(self)
         file_menu = menubar.addMenu("File")
+        tools_menu = menubar.addMenu("Tools")
         # Create Help Menu
         help_menu = menubar.addMenu("Help")
 
@@ -61,11 +91,45 @@ class TTPGuiUI(QWidget):
         about_action.triggered.connect(lambda: show_about_dialog(self))
         help_menu.addAction(about_action)
 
+        # Add Open action
+        open_action = QAction("Open...", self)
+        open_action.triggered.connect(lambda: open_capture_file(self))
+        file_menu.addAction(open_action)
+
+        # Add session actions
+        open_session_action = QAction("Open Session...", self)
+        open_session_action.triggered.connect(lambda: open_session(self))
+        file_menu.addAction(open_session_action)
+        save_session_action = QAction("Save Session", self)
+        save_session_action.setShortcut("Ctrl+S")
+        save_session_action.triggered.connect(lambda: save_current_session(self))
+        file_menu.addAction(save_session_action)
+        save_session_as_action = QAction("Save Session As...", self)
+        save_session_as_action.triggered.connect(lambda: save_current_session(self, choose_path=True))
+        file_menu.addAction(save_session_as_action)
+        # Changes since the last save are appended to the session file
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(30000)
+        self.autosave_timer.timeout.connect(lambda: autosave_session(self))
+        self.autosave_timer.start()
+
         # Add Reset action
         reset_action = QAction("Reset", self)
         reset_action.triggered.connect(self.reset_app)
         file_menu.addAction(reset_action)
 
+        # Add Auto-tag action
+        auto_tag_action = QAction("Auto-tag Variables", self)
+        auto_tag_action.triggered.connect(lambda: auto_tag(self))
+        tools_menu.addAction(auto_tag_action)
+
+        # Add Template Library action
+        library_action = QAction("Template Library...", self)
+        library_action.triggered.connect(lambda: show_library_dialog(self))
+        tools_menu.addAction(library_action)
+        self.auto_tag_timer = QTimer(self)
+        self.auto_tag_timer.setInterval(0)
+
         main_layout.addWidget(menubar)
 
         # Create QPlainTextEdit and make it read-only after initial text is entered
@@ -76,27 +140,88 @@ class TTPGuiUI(QWidget):
         self.text_edit.textChanged.connect(self.make_readonly)
         self.text_edit.setMinimumHeight(600)
 
-        # Create QListWidget
-        self.list_widget = QListWidget()
-        # Event to detect QListWidget item clicked
-        self.list_widget.itemClicked.connect(self.customize_ttp_entry)
+        # Variable list, a view over the selection model. A one column table with
+        # fixed row heights only ever touches the visible rows, where a QListView
+        # lays out every row again after each insert.
+        self.list_view = QTableView()
+        self.list_view.setModel(self.selections)
+        self.list_view.horizontalHeader().setVisible(False)
+        self.list_view.horizontalHeader().setStretchLastSection(True)
+        self.list_view.verticalHeader().setVisible(False)
+        self.list_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.list_view.verticalHeader().setDefaultSectionSize(self.list_view.fontMetrics().height() + 4)
+        self.list_view.setShowGrid(False)
+        self.list_view.setWordWrap(False)
+        self.list_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        # A single click only selects, so rows can be shift/ctrl-clicked for a bulk delete
+        self.list_view.doubleClicked.connect(
+            lambda index: self.customize_ttp_entry(self.selections.selection_at(index.row())))
+        self.list_filter = QLineEdit()
+        self.list_filter.setPlaceholderText('Filter variables...')
+        # Filtering walks every selection, so wait for typing to pause
+        self.list_filter_timer = QTimer(self)
+        self.list_filter_timer.setSingleShot(True)
+        self.list_filter_timer.setInterval(300)
+        self.list_filter_timer.timeout.connect(lambda: self.selections.set_filter(self.list_filter.text()))
+        self.list_filter.textChanged.connect(self.list_filter_timer.start)
+        self.list_sort = QComboBox()
+        self.list_sort.addItems(SORT_ORDERS)
+        self.list_sort.currentTextChanged.connect(self.selections.set_sort_order)
+
+        # Scrollbar that moves the editor's window over a large opened capture
+        self.window_scrollbar = QScrollBar(Qt.Orientation.Vertical)
+        self.window_scrollbar.setVisible(False)
+        self.window_timer = QTimer(self)
+        self.window_timer.setSingleShot(True)
+        self.window_timer.setInterval(150)
+        self.window_timer.timeout.connect(lambda: load_window(self, self.window_scrollbar.value()))
+        self.window_scrollbar.valueChanged.connect(lambda value: self.window_timer.start())
 
         # Create and add Labels and Widgets to the splitter
         text_area = QWidget()
         text_layout = QVBoxLayout()
-        text_layout.addWidget(QLabel('Paste text here (Do Not Type):'))
-        text_layout.addWidget(self.text_edit)
+        self.text_label = QLabel('Paste text here (Do Not Type):')
+        text_layout.addWidget(self.text_label)
+        editor_layout = QHBoxLayout()
+        editor_layout.addWidget(self.text_edit)
+        editor_layout.addWidget(self.window_scrollbar)
+        text_layout.addLayout(editor_layout)
         text_area.setLayout(text_layout)
 
         list_area = QWidget()
         list_layout = QVBoxLayout()
-        list_layout.addWidget(QLabel('Variables:'))
-        list_layout.addWidget(self.list_widget)
+        self.list_label = QLabel('Variables:')
+        list_layout.addWidget(self.list_label)
+        list_tools_layout = QHBoxLayout()
+        list_tools_layout.addWidget(self.list_filter, 1)
+        list_tools_layout.addWidget(QLabel('Sort:'))
+        list_tools_layout.addWidget(self.list_sort)
+        list_layout.addLayout(list_tools_layout)
+        list_layout.addWidget(self.list_view)
         list_area.setLayout(list_layout)
 
+        # Live template preview, rebuilt once selection changes settle
+        preview_area = QWidget()
+        preview_layout = QVBoxLayout()
+        preview_layout.addWidget(QLabel('Template preview:'))
+        self.template_preview = QPlainTextEdit()
+        self.template_preview.setReadOnly(True)
+        self.template_preview.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        preview_layout.addWidget(self.template_preview)
+        preview_area.setLayout(preview_layout)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(250)
+        self.preview_timer.timeout.connect(lambda: update_template_preview(self))
+
+        side_splitter = QSplitter(Qt.Orientation.Vertical)
+        side_splitter.addWidget(list_area)
+        side_splitter.addWidget(preview_area)
+
         splitter = QSplitter(Qt.Orientation.Horizontal)
         splitter.addWidget(text_area)
-        splitter.addWidget(list_area)
+        splitter.addWidget(side_splitter)
 
         # Set the initial proportions; the numbers are the 'stretch factors'
         splitter.setSizes([300, 100])
@@ -106,8 +231,19 @@ class TTPGuiUI(QWidget):
         # Generate Template Button
         self.generate_button = QPushButton('Generate Template', self)
         self.generate_button.clicked.connect(lambda: generate_template(self))
+        self.group_repeats_box = QCheckBox('Collapse repeated blocks into groups', self)
+        self.group_repeats_box.setChecked(True)
+        self.group_repeats_box.toggled.connect(lambda: self.preview_timer.start())
 
-        main_layout.addWidget(self.generate_button)
+        generate_layout = QHBoxLayout()
+        generate_layout.addWidget(self.generate_button, 1)
+        generate_layout.addWidget(self.group_repeats_box)
+        main_layout.addLayout(generate_layout)
+
+        # Stage timings of the last generate/test run
+        self.status_bar = QStatusBar(self)
+        self.status_bar.setSizeGripEnabled(False)
+        main_layout.addWidget(self.status_bar)
 
         # Set layout
         self.setLayout(main_layout)
@@ -117,8 +253,11 @@ class TTPGuiUI(QWidget):
         self.text_edit.customContextMenuRequested.connect(self.show_context_menu)
         self.text_edit.selectionChanged.connect(lambda: restrict_to_single_line(self))
 
-        self.list_widget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.list_widget.customContextMenuRequested.connect(self.show_list_context_menu)
+        self.list_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self.show_list_context_menu)
+
+        # Named selections are painted over the editor rather than into the document
+        self.selection_overlay = SelectionOverlay(self)
 
     def eventFilter(self, obj, event):
         if obj == self.text_edit and event.type() == QEvent.Type.HoverMove:
@@ -126,55 +265,61 @@ class TTPGuiUI(QWidget):
             hover_cursor = self.text_edit.cursorForPosition(event.position().toPoint())
             position = hover_cursor.position()
 
-            is_clickable = False
-
             # Check if hovered text corresponds to a named selection
-            for unique_id, data in self.named_selections.items():
-                if position >= data['start'] and position <= data['end']:
-                    is_clickable = True
-                    break
+            is_clickable = self.selection_at(position) is not None
 
-            if is_clickable:
-                QApplication.setOverrideCursor(Qt.CursorShape.PointingHandCursor)
-            else:
-                QApplication.restoreOverrideCursor()
+            # Only touch the override cursor stack when the hit result changes
+            if is_clickable != self.hover_clickable:
+                if is_clickable:
+                    QApplication.setOverrideCursor(Qt.CursorShape.PointingHandCursor)
+                    self.hover_clickable = True
+                else:
+                    self.clear_hover_cursor()
 
             return True  # Return True if you want to stop event propagation
+        if obj == self.text_edit and event.type() == QEvent.Type.HoverLeave:
+            self.clear_hover_cursor()
         return False  # Continue event propagation otherwise
+
+    def selection_at(self, position):
+        if self.capture is None:
+            return None
+        return self.selection_index.find(doc_to_offset(self, position))
+
+    def clear_hover_cursor(self):
+        if self.hover_clickable:
+            QApplication.restoreOverrideCursor()
+            self.hover_clickable = False
+
+    def closeEvent(self, event):
+        autosave_session(self)
+        self.test_runner.shutdown()
+        super().closeEvent(event)
+
     def initialize_theme(self, theme="light"):
         # Load the theme from a config file, or database, etc.
         # This is just a dummy example; your actual loading logic will vary.
         self.current_theme = theme
 
     def show_list_context_menu(self, pos):
-        item = self.list_widget.itemAt(pos)
-        if item:
-            context_menu = QMenu(self)
-            delete_action = QAction("Delete", self)
-            delete_action.triggered.connect(lambda: self.delete_item(item))
-            context_menu.addAction(delete_action)
-            context_menu.exec(self.list_widget.mapToGlobal(pos))
-
-    def delete_item(self, item):
-        # Unhighlight source text
-        start = item.selection_start
-        end = item.selection_end
-
-        cursor = self.text_edit.textCursor()
-        cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
-        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
-
-        self.text_edit.setReadOnly(False)
-        highlight_text(self, start, end, default=True)
-        self.text_edit.setReadOnly(True)
-
-        # Remove item from QListWidget
-        row = self.list_widget.row(item)
-        self.list_widget.takeItem(row)
+        if not self.list_view.indexAt(pos).isValid():
+            return
+        rows = self.list_view.selectionModel().selectedRows()
+        if not rows:
+            rows = [self.list_view.indexAt(pos)]
+        selections = [self.selections.selection_at(index.row()) for index in rows]
+        context_menu = QMenu(self)
+        delete_action = QAction("Delete" if len(selections) == 1 else f"Delete {len(selections)} Variables", self)
+        delete_action.triggered.connect(lambda: self.delete_selections(selections))
+        context_menu.addAction(delete_action)
+        context_menu.exec(self.list_view.mapToGlobal(pos))
 
+    def delete_selections(self, selections):
+        # Drop the selections from the list, the hit-test index and the template; unhighlight source text
+        remove_named_selections(self, selections)
 
     def customize_ttp_entry(self, item):
-        QApplication.restoreOverrideCursor()
+        self.clear_hover_cursor()
         dialog = QDialog(self)
         dialog.setWindowTitle('Customize TTP Entry')
         dialog.setMinimumWidth(400)
@@ -194,13 +339,17 @@ class TTPGuiUI(QWidget):
         dialog.setLayout(layout)
 
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            item.ttp_text = f"{{{{{input_text.text()}}}}}"
-        print(item.ttp_text)
-
+            self.selections.set_ttp_text(item.key, f"{{{{{input_text.text()}}}}}")
+            self.session_journal.update(item.start, item.end, item.ttp_text)
+            self.template_spans.update(item.key, item.ttp_text)
+            self.preview_timer.start()
 
     def make_readonly(self):
-        if self.text_edit.toPlainText():
+        if not self.text_edit.document().isEmpty():
             self.text_edit.setReadOnly(True)
+            # Index pasted text once, selections then never copy the document
+            if self.capture is None:
+                self.capture = Capture.from_text(self.text_edit.toPlainText())
 
     def show_context_menu(self, pos):
         context_menu = QMenu(self)
@@ -211,9 +360,28 @@ class TTPGuiUI(QWidget):
 
 
     def reset_app(self):
+        if self.auto_tag_timer.isActive():
+            self.auto_tag_timer.stop()
+            self.auto_tag_timer.timeout.disconnect()
+        self.list_label.setText('Variables:')
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+        self.window_first_line = 0
+        self.window_timer.stop()
+        self.window_scrollbar.setVisible(False)
+        self.text_label.setText('Paste text here (Do Not Type):')
         self.text_edit.setPlainText("")
         self.text_edit.setReadOnly(False)
-        self.list_widget.clear()
+        self.selections.clear()
+        self.selection_index.clear()
+        self.template_spans.clear()
+        self.preview_timer.start()
+        self.selection_overlay.schedule()
+        # A reset starts a new session
+        self.session_journal.clear()
+        self.session_path = None
+        self.clear_hover_cursor()
 
 def main():
     import sys